@@ -1,22 +1,30 @@
 from django.contrib import admin
-from .models import Building, Room, Poi
+from .models import Building, Campus, Room, Poi
+
+
+@admin.register(Campus)
+class CampusAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "slug", "lat", "lng")
+    search_fields = ("name", "slug")
+    prepopulated_fields = {"slug": ("name",)}
 
 
 @admin.register(Building)
 class BuildingAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "code", "address", "lat", "lng")
+    list_display = ("id", "name", "code", "campus", "address", "lat", "lng")
+    list_filter = ("campus",)
     search_fields = ("name", "code", "address")
 
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
     list_display = ("id", "building", "number", "floor")
-    list_filter = ("building", "floor")
+    list_filter = ("building__campus", "building", "floor")
     search_fields = ("number", "description")
 
 
 @admin.register(Poi)
 class PoiAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "type", "building", "lat", "lng")
-    list_filter = ("type", "building")
+    list_display = ("id", "title", "type", "campus", "building", "lat", "lng")
+    list_filter = ("campus", "type", "building")
     search_fields = ("title", "info")
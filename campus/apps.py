@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CampusConfig(AppConfig):
     name = 'campus'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,104 @@
+"""
+Versioned caches of campus data.
+
+Every campus has its own data version, bumped by changes to its buildings,
+rooms or POIs (see ``campus.signals``), so an edit on one campus leaves the
+caches of the others intact. The ``campus`` cache is shared by all
+processes. The background worker builds the payload for the new version
+and publishes it; until then requests keep getting the previous one, so
+their latency never includes the rebuild.
+"""
+
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from campus_navigator.metrics import record_cache
+
+from .models import Campus, DataVersion, Poi
+
+
+def data_version_key(campus_id):
+    return f"campus:{campus_id}"
+
+
+def get_data_version(campus_id):
+    key = data_version_key(campus_id)
+    version = DataVersion.objects.filter(key=key).values_list("version", flat=True).first()
+    return version or 0
+
+
+def bump_data_version(campus_id):
+    key = data_version_key(campus_id)
+    if DataVersion.objects.filter(key=key).update(version=F("version") + 1):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(key=key, version=1)
+    except IntegrityError:
+        DataVersion.objects.filter(key=key).update(version=F("version") + 1)
+
+
+POI_FIELDS = ("id", "title", "type", "lat", "lng", "info")
+
+
+def build_pois_payload(campus_id, snapshot=None):
+    if snapshot is not None:
+        pois = [{field: poi[field] for field in POI_FIELDS} for poi in snapshot.pois()]
+    else:
+        pois = list(Poi.objects.filter(campus_id=campus_id).values(*POI_FIELDS))
+    return json.dumps(pois, cls=DjangoJSONEncoder).encode()
+
+
+def pois_key(campus_id):
+    return f"campus:{campus_id}:pois"
+
+
+def publish_pois_payload(campus_id):
+    """Build the payload of the campus' current data version and make requests serve it."""
+    from .snapshot import current_snapshot
+
+    cache = caches[settings.CAMPUS_CACHE_ALIAS]
+    version = get_data_version(campus_id)
+    payload = build_pois_payload(campus_id, current_snapshot(campus_id, version))
+    published = cache.get(pois_key(campus_id))
+    # A slower job for an older version must not replace a newer payload.
+    if published is None or published[0] <= version:
+        cache.set(pois_key(campus_id), (version, payload), settings.CAMPUS_CACHE_TIMEOUT)
+    return payload
+
+
+def pois_payload(campus_id):
+    """
+    JSON body of ``pois_json``: the last payload published for the campus.
+
+    After an edit it may lag behind the data until the ``campus.warm_caches``
+    job publishes the new version. The request builds the payload itself
+    only when nothing has been published yet, or when the job has not caught
+    up within ``CAMPUS_PUBLISH_GRACE`` seconds (no worker running).
+    """
+    published = caches[settings.CAMPUS_CACHE_ALIAS].get(pois_key(campus_id))
+    if published is not None:
+        version, payload = published
+        current, changed_at = DataVersion.objects.filter(key=data_version_key(campus_id)).values_list(
+            "version", "updated_at",
+        ).first() or (0, None)
+        fresh = version == current
+        grace = timedelta(seconds=settings.CAMPUS_PUBLISH_GRACE)
+        if fresh or (changed_at is not None and timezone.now() - changed_at <= grace):
+            record_cache("pois_json", fresh)
+            return payload
+    record_cache("pois_json", False)
+    return publish_pois_payload(campus_id)
+
+
+def warm_caches(campus_id=None):
+    campus_ids = [campus_id] if campus_id is not None else Campus.objects.values_list("id", flat=True)
+    for pk in campus_ids:
+        publish_pois_payload(pk)
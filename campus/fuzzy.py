@@ -0,0 +1,345 @@
+"""
+Typo- and keyboard-layout-tolerant search over campus objects.
+
+Used by ``search_view`` only when the exact ``icontains`` search finds too
+little. The query is tried as typed, re-mapped between the ЙЦУКЕН and
+QWERTY layouts ("cnjkjdfz" -> "столовая") and transliterated in both
+directions. Every variant is matched word by word against the words of
+building names/codes, room numbers and POI titles/types, allowing a small
+edit distance that grows with word length. Candidates come from a trigram
+index and are verified with a bounded Levenshtein distance.
+
+Each campus has its own index per process. It is read from the
+memory-mapped snapshot when one exists for the data version
+(``campus.snapshot``) and built from the database otherwise. After a data
+change searches keep using the previous index: the new snapshot is picked
+up as soon as it is written, and without one the index is rebuilt once the
+response that noticed the change has been sent. Only a process that has no
+index for the campus yet builds it while the request waits.
+"""
+
+import bisect
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from campus_navigator.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+_EN = "`qwertyuiop[]asdfghjkl;'zxcvbnm,."
+_RU = "ёйцукенгшщзхъфывапролджэячсмитьбю"
+EN_TO_RU = str.maketrans(_EN + _EN.upper(), _RU + _RU.upper())
+RU_TO_EN = str.maketrans(_RU + _RU.upper(), _EN + _EN.upper())
+
+_LAT_TO_CYR = [
+    ("shch", "щ"), ("sch", "щ"), ("yo", "е"), ("zh", "ж"), ("kh", "х"), ("ts", "ц"),
+    ("ch", "ч"), ("sh", "ш"), ("yu", "ю"), ("ya", "я"), ("ye", "е"),
+    ("a", "а"), ("b", "б"), ("v", "в"), ("g", "г"), ("d", "д"), ("e", "е"), ("z", "з"),
+    ("i", "и"), ("j", "й"), ("y", "ы"), ("k", "к"), ("l", "л"), ("m", "м"), ("n", "н"),
+    ("o", "о"), ("p", "п"), ("r", "р"), ("s", "с"), ("t", "т"), ("u", "у"), ("f", "ф"),
+    ("h", "х"), ("c", "ц"), ("w", "в"), ("x", "кс"), ("q", "к"),
+]
+_CYR_TO_LAT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
+    "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+_lat_to_cyr_re = re.compile("|".join(re.escape(lat) for lat, _ in _LAT_TO_CYR))
+_lat_to_cyr_map = dict(_LAT_TO_CYR)
+_word_re = re.compile(r"\w+")
+
+
+def normalize(text):
+    return text.lower().replace("ё", "е")
+
+
+def tokenize(text):
+    return _word_re.findall(normalize(text))
+
+
+def transliterate_to_cyrillic(text):
+    return _lat_to_cyr_re.sub(lambda m: _lat_to_cyr_map[m.group(0)], normalize(text))
+
+
+def transliterate_to_latin(text):
+    return "".join(_CYR_TO_LAT.get(ch, ch) for ch in normalize(text))
+
+
+def query_variants(query):
+    """The query as typed plus its layout-swapped and transliterated forms."""
+    variants = [normalize(query)]
+    for candidate in (
+        query.translate(EN_TO_RU),
+        query.translate(RU_TO_EN),
+        transliterate_to_cyrillic(query),
+        transliterate_to_latin(query),
+    ):
+        candidate = normalize(candidate)
+        if candidate not in variants:
+            variants.append(candidate)
+    return variants
+
+
+def max_distance(word):
+    """Edit distance tolerated for a query word of this length."""
+    if word.isdigit() or len(word) <= 3:
+        return 0
+    if len(word) <= 5:
+        return 1
+    return 2
+
+
+def bounded_levenshtein(a, b, limit):
+    """Levenshtein distance, or ``limit + 1`` as soon as it must exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Words of campus objects mapped to ``(kind, pk)`` references."""
+
+    def __init__(self, entries):
+        """``entries`` is an iterable of ``(kind, pk, text)``."""
+        self.postings = defaultdict(set)
+        for kind, pk, text in entries:
+            for word in tokenize(text or ""):
+                self.postings[word].add((kind, pk))
+        self.words = sorted(self.postings)
+        self.trigram_postings = defaultdict(list)
+        for position, word in enumerate(self.words):
+            for gram in trigrams(word):
+                self.trigram_postings[gram].append(position)
+
+    # Lookups used by the matching code; ``campus.snapshot.PackedFuzzyIndex``
+    # answers them from a memory-mapped snapshot instead of these dicts.
+
+    def has_word(self, word):
+        return word in self.postings
+
+    def refs(self, word):
+        return self.postings[word]
+
+    def trigram_positions(self, gram):
+        return self.trigram_postings.get(gram, ())
+
+    def _similar(self, word, limit):
+        """Indexed words within ``limit`` edits of ``word``."""
+        if limit == 0:
+            if self.has_word(word):
+                yield word, 0
+            return
+        # An edit destroys at most three padded trigrams, so a word within
+        # ``limit`` edits shares at least this many distinct ones with the query.
+        grams = trigrams(word)
+        needed = len(grams) - 3 * limit
+        if needed < 1:
+            counts = dict.fromkeys(range(len(self.words)), 0)
+        else:
+            counts = defaultdict(int)
+            for gram in grams:
+                for position in self.trigram_positions(gram):
+                    counts[position] += 1
+        for position, shared in counts.items():
+            if shared < needed:
+                continue
+            candidate = self.words[position]
+            distance = bounded_levenshtein(word, candidate, limit)
+            if distance <= limit:
+                yield candidate, distance
+
+    def _prefixed(self, word):
+        start = bisect.bisect_left(self.words, word)
+        for candidate in self.words[start:start + 50]:
+            if not candidate.startswith(word):
+                break
+            yield candidate
+
+    def match_word(self, word):
+        """Best distance of each indexed word close to ``word``."""
+        matches = dict(self._similar(word, max_distance(word)))
+        if len(word) >= 4 or word.isdigit():
+            for candidate in self._prefixed(word):
+                matches.setdefault(candidate, 1)
+        return matches
+
+    def search(self, query, limit=20):
+        """
+        Return ``(refs, suggestion)``: references ordered by relevance and the
+        corrected query (or ``None`` if the words were found as typed).
+        """
+        best_refs, best_cost, best_words = [], None, None
+        for variant in query_variants(query):
+            words = tokenize(variant)
+            if not words:
+                continue
+            scores, matched_words = None, []
+            for word in words:
+                matches = self.match_word(word)
+                if not matches:
+                    scores = None
+                    break
+                closest = min(matches, key=lambda w: (matches[w], len(w)))
+                matched_words.append(closest)
+                word_scores = {}
+                for candidate, distance in matches.items():
+                    for ref in self.refs(candidate):
+                        if ref not in word_scores or distance < word_scores[ref]:
+                            word_scores[ref] = distance
+                if scores is None:
+                    scores = word_scores
+                else:
+                    # Every query word must match something in the object.
+                    scores = {ref: scores[ref] + d for ref, d in word_scores.items() if ref in scores}
+            if not scores:
+                continue
+            cost = min(scores.values())
+            if best_cost is None or cost < best_cost:
+                best_cost = cost
+                best_refs = sorted(scores, key=lambda ref: (scores[ref], ref))[:limit]
+                best_words = matched_words
+
+        suggestion = " ".join(best_words) if best_words else None
+        if suggestion == " ".join(tokenize(query)):
+            suggestion = None
+        return best_refs, suggestion
+
+
+_lock = threading.Lock()
+_build_locks = {}
+_cached = {}
+_pending = set()
+
+
+def _build_lock(campus_id):
+    with _lock:
+        return _build_locks.setdefault(campus_id, threading.Lock())
+
+
+def build_index(campus_id):
+    from .models import Building, Poi, Room
+
+    def entries():
+        buildings = Building.objects.filter(campus_id=campus_id).values_list("id", "name", "code")
+        for pk, name, code in buildings.iterator():
+            yield "building", pk, f"{name} {code}"
+        for pk, number in Room.objects.filter(building__campus_id=campus_id).values_list("id", "number").iterator():
+            yield "room", pk, number
+        for pk, title, type_ in Poi.objects.filter(campus_id=campus_id).values_list("id", "title", "type").iterator():
+            yield "poi", pk, f"{title} {type_}"
+
+    return FuzzyIndex(entries())
+
+
+def _load_index(campus_id):
+    from .cache import get_data_version
+    from .snapshot import current_snapshot
+
+    version = get_data_version(campus_id)
+    snapshot = current_snapshot(campus_id, version)
+    index = snapshot.search_index() if snapshot is not None else build_index(campus_id)
+    with _lock:
+        cached = _cached.get(campus_id)
+        # A rebuild that started earlier must not replace a newer index.
+        if cached is None or cached[0] <= version:
+            _cached[campus_id] = (version, index)
+    return index
+
+
+def get_index(campus_id):
+    """The campus' fuzzy index; may lag behind a data change, see the module docstring."""
+    from .cache import get_data_version
+    from .snapshot import current_snapshot
+
+    version = get_data_version(campus_id)
+    cached = _cached.get(campus_id)
+    hit = cached is not None and cached[0] == version
+    record_cache("fuzzy_index", hit)
+    if hit:
+        return cached[1]
+    if cached is not None:
+        # Mapping a snapshot is cheap; building from the database is not.
+        snapshot = current_snapshot(campus_id, version)
+        if snapshot is not None:
+            index = snapshot.search_index()
+            with _lock:
+                _cached[campus_id] = (version, index)
+            return index
+        with _lock:
+            _pending.add(campus_id)
+        return cached[1]
+    # Only searches on this campus wait for the first build; the others
+    # keep using their indexes.
+    with _build_lock(campus_id):
+        cached = _cached.get(campus_id)
+        if cached is not None:
+            return cached[1]
+        return _load_index(campus_id)
+
+
+def rebuild_pending_indexes():
+    """Rebuild the indexes ``get_index`` found outdated; run after a response is sent."""
+    from .cache import get_data_version
+
+    while True:
+        with _lock:
+            if not _pending:
+                return
+            campus_id = _pending.pop()
+        lock = _build_lock(campus_id)
+        # Another thread is already rebuilding this campus.
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            cached = _cached.get(campus_id)
+            if cached is None or cached[0] != get_data_version(campus_id):
+                _load_index(campus_id)
+        except Exception:
+            logger.exception("Could not rebuild the search index of campus %s", campus_id)
+        finally:
+            lock.release()
+
+
+def fuzzy_search(query, campus_id, limit=20):
+    """
+    Fuzzy-match ``query`` within a campus and return
+    ``(buildings, rooms, pois, suggestion)`` as lists of model instances in
+    relevance order.
+    """
+    from .models import Building, Poi, Room
+
+    refs, suggestion = get_index(campus_id).search(query, limit=limit)
+    ids = defaultdict(list)
+    for kind, pk in refs:
+        ids[kind].append(pk)
+
+    def fetch(queryset, kind):
+        objects = queryset.in_bulk(ids[kind]) if ids[kind] else {}
+        return [objects[pk] for pk in ids[kind] if pk in objects]
+
+    return (
+        fetch(Building.objects.all(), "building"),
+        fetch(Room.objects.select_related("building"), "room"),
+        fetch(Poi.objects.select_related("building"), "poi"),
+        suggestion,
+    )
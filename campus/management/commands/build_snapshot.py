@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from campus.models import Campus
+from campus.snapshot import enabled, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Записывает снимки данных кампусов для чтения через mmap (см. SNAPSHOT_DIR)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campus", default=None, help="Slug кампуса (по умолчанию — все).")
+
+    def handle(self, *args, campus, **options):
+        if not enabled():
+            raise CommandError("SNAPSHOT_DIR не задан.")
+        campuses = Campus.objects.all()
+        if campus:
+            campuses = campuses.filter(slug=campus)
+            if not campuses.exists():
+                raise CommandError(f"Кампус «{campus}» не найден.")
+        for obj in campuses:
+            path = write_snapshot(obj.id)
+            self.stdout.write(f"{obj.slug}: {path} ({path.stat().st_size} байт)")
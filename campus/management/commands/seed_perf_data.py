@@ -0,0 +1,76 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from campus.cache import warm_caches
+from campus.models import Building, Campus, Poi, Room, default_campus
+from campus.roomcodes import normalize_key
+from campus.signals import bulk_changes
+
+BUILDING_PREFIX = "Синтетический корпус"
+POI_PREFIX = "Синтетическая точка"
+POI_TYPES = ["столовая", "вход", "деканат", "туалет", "лифт", "библиотека", "аудитория"]
+
+
+class Command(BaseCommand):
+    help = "Создаёт (или удаляет) большой синтетический набор данных для тестов производительности."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buildings", type=int, default=20)
+        parser.add_argument("--rooms", type=int, default=2000)
+        parser.add_argument("--pois", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--campus", default=None, help="Slug кампуса (по умолчанию — основной).")
+        parser.add_argument("--clear", action="store_true", help="Только удалить ранее созданные данные.")
+
+    def handle(self, *args, buildings, rooms, pois, seed, campus, clear, **options):
+        campus = Campus.objects.get(slug=campus) if campus else default_campus()
+        with transaction.atomic(), bulk_changes() as changed:
+            Poi.objects.filter(campus=campus, title__startswith=POI_PREFIX).delete()
+            Building.objects.filter(campus=campus, name__startswith=BUILDING_PREFIX).delete()
+            if not clear:
+                self.seed(random.Random(seed), campus, buildings, rooms, pois)
+                changed.add(campus.id)
+        # The perf suite fetches /api/pois/ right away and may run without a
+        # job worker, so the new payload is published here.
+        warm_caches(campus.id)
+        if clear:
+            self.stdout.write("Синтетические данные удалены.")
+        else:
+            self.stdout.write(f"Создано: корпусов {buildings}, аудиторий {rooms}, точек {pois}.")
+
+    def seed(self, rng, campus, buildings, rooms, pois):
+        # bulk_create skips Model.save(), so the lookup keys are filled here.
+        created = Building.objects.bulk_create(
+            Building(
+                campus=campus,
+                name=f"{BUILDING_PREFIX} {i}",
+                code=f"{i + 1}СК",
+                code_key=normalize_key(f"{i + 1}СК"),
+                lat=54.35 + rng.uniform(-0.01, 0.01),
+                lng=48.39 + rng.uniform(-0.01, 0.01),
+            )
+            for i in range(max(buildings, 1))
+        )
+        Room.objects.bulk_create(
+            Room(
+                building=created[i % len(created)],
+                number=str(100 + i // len(created)),
+                number_key=str(100 + i // len(created)),
+                floor=1 + (i // len(created)) // 100,
+            )
+            for i in range(rooms)
+        )
+        Poi.objects.bulk_create(
+            Poi(
+                campus=campus,
+                building=rng.choice(created),
+                title=f"{POI_PREFIX} {i}",
+                type=rng.choice(POI_TYPES),
+                lat=54.35 + rng.uniform(-0.01, 0.01),
+                lng=48.39 + rng.uniform(-0.01, 0.01),
+                info="Создано командой seed_perf_data",
+            )
+            for i in range(pois)
+        )
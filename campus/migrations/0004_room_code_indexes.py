@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+from campus.roomcodes import normalize_key
+
+
+def fill_keys(apps, schema_editor):
+    Building = apps.get_model("campus", "Building")
+    Room = apps.get_model("campus", "Room")
+    for building in Building.objects.all():
+        building.code_key = normalize_key(building.code)
+        building.save(update_fields=["code_key"])
+    for room in Room.objects.all():
+        room.number_key = normalize_key(room.number)
+        room.save(update_fields=["number_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campus', '0003_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='code_key',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='number_key',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(fields=['code'], name='campus_building_code'),
+        ),
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(fields=['code_key'], name='campus_building_code_key'),
+        ),
+        migrations.AddIndex(
+            model_name='poi',
+            index=models.Index(fields=['type'], name='campus_poi_type'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['building', 'number_key'], name='campus_room_building_number'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['number_key'], name='campus_room_number_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='room',
+            constraint=models.UniqueConstraint(fields=('building', 'number'), name='campus_room_unique_number'),
+        ),
+    ]
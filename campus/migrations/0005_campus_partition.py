@@ -0,0 +1,79 @@
+# Generated by Django 6.0 on 2026-10-19 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def assign_default_campus(apps, schema_editor):
+    Campus = apps.get_model("campus", "Campus")
+    Building = apps.get_model("campus", "Building")
+    Poi = apps.get_model("campus", "Poi")
+    DataVersion = apps.get_model("campus", "DataVersion")
+    campus, _ = Campus.objects.get_or_create(slug="main", defaults={"name": "Основной кампус"})
+    Building.objects.update(campus=campus)
+    for poi in Poi.objects.select_related("building"):
+        poi.campus_id = poi.building.campus_id if poi.building_id else campus.pk
+        poi.save(update_fields=["campus"])
+    # Data versions are now kept per campus ("campus:<id>").
+    DataVersion.objects.filter(key="campus").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campus', '0004_room_code_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название кампуса')),
+                ('slug', models.SlugField(help_text='Например: main, north, branch-2', unique=True, verbose_name='Адрес в URL')),
+                ('lat', models.FloatField(blank=True, null=True, verbose_name='Широта центра')),
+                ('lng', models.FloatField(blank=True, null=True, verbose_name='Долгота центра')),
+            ],
+            options={
+                'verbose_name': 'Кампус',
+                'verbose_name_plural': 'Кампусы',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='building',
+            name='campus_building_code_key',
+        ),
+        migrations.RemoveIndex(
+            model_name='poi',
+            name='campus_poi_type',
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='campus',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='buildings', to='campus.campus', verbose_name='Кампус'),
+        ),
+        migrations.AddField(
+            model_name='poi',
+            name='campus',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pois', to='campus.campus', verbose_name='Кампус'),
+        ),
+        migrations.RunPython(assign_default_campus, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='building',
+            name='campus',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buildings', to='campus.campus', verbose_name='Кампус'),
+        ),
+        migrations.AlterField(
+            model_name='poi',
+            name='campus',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pois', to='campus.campus', verbose_name='Кампус'),
+        ),
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(fields=['campus', 'code_key'], name='campus_building_campus_code'),
+        ),
+        migrations.AddIndex(
+            model_name='poi',
+            index=models.Index(fields=['campus', 'type'], name='campus_poi_campus_type'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-19 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campus', '0005_campus_partition'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='room',
+            name='campus_room_unique_number',
+        ),
+        # The unique constraint below leads with the same columns.
+        migrations.RemoveIndex(
+            model_name='room',
+            name='campus_room_building_number',
+        ),
+        migrations.AddConstraint(
+            model_name='room',
+            constraint=models.UniqueConstraint(fields=('building', 'number_key'), name='campus_room_unique_number_key'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 19:05
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # The shared "campus" cache is a DatabaseCache; without its table
+    # pois_json would fail right after `migrate`. Existing tables are skipped.
+    call_command("createcachetable", database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campus', '0006_room_unique_number_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,53 @@
-from django.db import models
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib.auth.models import User
 
+from .roomcodes import normalize_key
+
+
+class Campus(models.Model):
+    """Кампус или филиал; все корпуса и точки принадлежат ровно одному кампусу."""
+    name = models.CharField("Название кампуса", max_length=255)
+    slug = models.SlugField("Адрес в URL", unique=True, help_text="Например: main, north, branch-2")
+    lat = models.FloatField("Широта центра", null=True, blank=True)
+    lng = models.FloatField("Долгота центра", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Кампус"
+        verbose_name_plural = "Кампусы"
+
+    def __str__(self):
+        return self.name
+
+
+def default_campus():
+    """Кампус по умолчанию (settings.DEFAULT_CAMPUS_SLUG) для данных без явного кампуса."""
+    campus, _ = Campus.objects.get_or_create(
+        slug=settings.DEFAULT_CAMPUS_SLUG,
+        defaults={"name": "Основной кампус"},
+    )
+    return campus
+
+
+def default_campus_id():
+    return default_campus().pk
+
+
+def with_key_field(update_fields, source, key):
+    """update_fields, дополненные полем-ключом, если сохраняется его источник."""
+    if update_fields is None or source not in update_fields:
+        return update_fields
+    return {*update_fields, key}
+
 
 class Building(models.Model):
+    campus = models.ForeignKey(
+        Campus,
+        on_delete=models.CASCADE,
+        related_name="buildings",
+        verbose_name="Кампус",
+    )
     name = models.CharField("Название корпуса", max_length=255)
     code = models.CharField(
         "Код корпуса",
@@ -10,11 +55,33 @@ class Building(models.Model):
         blank=True,
         help_text="Например: Гл, А, Б, ИИТ и т.п.",
     )
+    # Нормализованный код для поиска по коду аудитории (см. campus.roomcodes)
+    code_key = models.CharField(max_length=50, blank=True, editable=False)
     address = models.CharField("Адрес", max_length=255, blank=True)
 
     lat = models.FloatField("Широта", help_text="Для отображения на карте")
     lng = models.FloatField("Долгота", help_text="Для отображения на карте")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["code"], name="campus_building_code"),
+            models.Index(fields=["campus", "code_key"], name="campus_building_campus_code"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.campus_id is None:
+            self.campus = default_campus()
+        self.code_key = normalize_key(self.code)
+        kwargs["update_fields"] = with_key_field(kwargs.get("update_fields"), "code", "code_key")
+        previous_campus_id = None
+        if self.pk is not None:
+            previous_campus_id = Building.objects.filter(pk=self.pk).values_list("campus_id", flat=True).first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Точки корпуса переезжают в другой кампус вместе с ним.
+            if previous_campus_id is not None and previous_campus_id != self.campus_id:
+                self.pois.update(campus_id=self.campus_id)
+
     def __str__(self):
         return self.name or self.code or f"Корпус #{self.pk}"
 
@@ -27,15 +94,42 @@ class Room(models.Model):
         verbose_name="Корпус",
     )
     number = models.CharField("Номер аудитории", max_length=50)
+    number_key = models.CharField(max_length=50, blank=True, editable=False)
     floor = models.IntegerField("Этаж", default=1)
     description = models.TextField("Описание", blank=True)
 
+    class Meta:
+        constraints = [
+            # "214а" и "214a" (латиница) — одна и та же аудитория.
+            models.UniqueConstraint(fields=["building", "number_key"], name="campus_room_unique_number_key"),
+        ]
+        indexes = [
+            models.Index(fields=["number_key"], name="campus_room_number_key"),
+        ]
+
+    def clean(self):
+        # number_key не редактируется в формах, поэтому ограничение проверяется здесь.
+        duplicates = Room.objects.filter(building_id=self.building_id, number_key=normalize_key(self.number))
+        if self.building_id is not None and duplicates.exclude(pk=self.pk).exists():
+            raise ValidationError({"number": "В этом корпусе уже есть аудитория с таким номером."})
+
+    def save(self, *args, **kwargs):
+        self.number_key = normalize_key(self.number)
+        kwargs["update_fields"] = with_key_field(kwargs.get("update_fields"), "number", "number_key")
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.building.code or self.building.name} – {self.number}"
 
 
 class Poi(models.Model):
     """Точки интереса: столовые, деканаты, входы, лифты и т.п."""
+    campus = models.ForeignKey(
+        Campus,
+        on_delete=models.CASCADE,
+        related_name="pois",
+        verbose_name="Кампус",
+    )
     building = models.ForeignKey(
         Building,
         on_delete=models.CASCADE,
@@ -56,6 +150,19 @@ class Poi(models.Model):
 
     info = models.TextField("Доп. информация", blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["campus", "type"], name="campus_poi_campus_type"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Точка в корпусе всегда относится к кампусу этого корпуса.
+        if self.building_id is not None:
+            self.campus_id = self.building.campus_id
+        elif self.campus_id is None:
+            self.campus = default_campus()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
@@ -69,4 +176,14 @@ class FavoritePoi(models.Model):
         unique_together = ("user", "poi")  # нельзя добавить одно и то же дважды
 
     def __str__(self):
-        return f"{self.user.username} → {self.poi.title}"
\ No newline at end of file
+        return f"{self.user.username} → {self.poi.title}"
+
+
+class DataVersion(models.Model):
+    """Счётчик изменений данных кампуса; входит в ключи кешей."""
+    key = models.CharField("Ключ", max_length=100, unique=True)
+    version = models.PositiveBigIntegerField("Версия", default=0)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: v{self.version}"
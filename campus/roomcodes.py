@@ -0,0 +1,77 @@
+"""
+Parsing of room codes as users type them: "Гл-305", "ИИТ 214", "2к305",
+"ауд. 101а", "305 (Б)".
+
+Building codes and room numbers are compared through ``normalize_key``,
+which folds case, separators and Latin letters that look like Cyrillic ones
+("A-101" typed on an English layout is the same as "А-101"). The normalised
+values are stored in ``Building.code_key`` and ``Room.number_key`` so a code
+resolves with indexed exact lookups within a campus.
+"""
+
+import re
+
+LOOKALIKES = str.maketrans("ABCEHKMOPTXYЁ", "АВСЕНКМОРТХУЕ")
+
+_separators_re = re.compile(r"[\s\-–—_]+")
+_prefix_re = re.compile(r"^(?:аудитория|ауд|кабинет|каб|room|rm)\.?\s*", re.IGNORECASE)
+
+_CODE = r"(?P<code>\d*[^\W\d_]+)"
+_NUMBER = r"(?P<number>\d+(?:[/.]\d+)?(?:[\s\-]?[^\W\d_])?)"
+_SEP = r"[\s\-–—./\\,:]*"
+
+_code_first_re = re.compile(rf"{_CODE}{_SEP}(?:(?:аудитория|ауд|каб)\.?\s*)?{_NUMBER}", re.IGNORECASE)
+_number_only_re = re.compile(_NUMBER)
+_number_first_re = re.compile(rf"{_NUMBER}\s*[\s\-–—/,(]\s*{_CODE}\)?")
+
+
+def normalize_key(value):
+    """Canonical form of a building code or room number used for lookups."""
+    return _separators_re.sub("", value or "").upper().translate(LOOKALIKES)
+
+
+def parse_room_code(text):
+    """
+    Split a room code into ``(building_code, number)``.
+
+    ``building_code`` is ``None`` when only a number was given. Returns
+    ``None`` if the text does not look like a room code at all.
+    """
+    text = _prefix_re.sub("", (text or "").strip())
+    if not text:
+        return None
+
+    match = _code_first_re.fullmatch(text)
+    if match:
+        return match["code"], match["number"]
+    match = _number_only_re.fullmatch(text)
+    if match:
+        return None, match["number"]
+    match = _number_first_re.fullmatch(text)
+    if match:
+        return match["code"], match["number"]
+    return None
+
+
+def resolve_room_code(text, campus_id):
+    """
+    Return ``(parsed, rooms)`` for a room code typed on a campus.
+
+    ``rooms`` is a queryset resolved with exact lookups on the indexed
+    ``code_key``/``number_key`` columns; it is empty when nothing matches and
+    ``None`` when the text could not be parsed.
+    """
+    from .models import Building, Room
+
+    parsed = parse_room_code(text)
+    if parsed is None:
+        return None, None
+    code, number = parsed
+
+    rooms = Room.objects.select_related("building").filter(number_key=normalize_key(number))
+    if code is not None:
+        building_ids = Building.objects.filter(campus_id=campus_id, code_key=normalize_key(code)).values("id")
+        rooms = rooms.filter(building_id__in=building_ids)
+    else:
+        rooms = rooms.filter(building__campus_id=campus_id)
+    return parsed, rooms.order_by("building_id", "number")
@@ -0,0 +1,99 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from jobs.queue import enqueue_on_commit
+
+from . import fuzzy, snapshot
+from .cache import bump_data_version
+from .models import Building, Poi, Room
+
+_state = threading.local()
+
+
+def data_changed(campus_id):
+    """Invalidate the campus' versioned caches and rebuild them in the background."""
+    bump_data_version(campus_id)
+    # The delay lets a burst of edits (an import, a series of admin saves)
+    # coalesce into a single pending job per campus.
+    if snapshot.enabled():
+        enqueue_on_commit("campus.build_snapshot", {"campus_id": campus_id}, delay=settings.JOBS_COALESCE_DELAY)
+    enqueue_on_commit("campus.warm_caches", {"campus_id": campus_id}, delay=settings.JOBS_COALESCE_DELAY)
+
+
+@contextmanager
+def bulk_changes():
+    """
+    Handle all changes made inside the block as one data change per campus.
+
+    Yields the set of touched campus ids; code that bypasses model signals
+    (``bulk_create``, ``update``) adds to it by hand.
+    """
+    changed = getattr(_state, "changed", None)
+    if changed is not None:
+        yield changed
+        return
+    _state.changed = changed = set()
+    try:
+        yield changed
+    finally:
+        _state.changed = None
+    for campus_id in changed:
+        data_changed(campus_id)
+
+
+def campus_id_of(instance):
+    if isinstance(instance, Room):
+        return Building.objects.filter(pk=instance.building_id).values_list("campus_id", flat=True).first()
+    return instance.campus_id
+
+
+def _changed(*campus_ids):
+    pending = getattr(_state, "changed", None)
+    for campus_id in set(campus_ids):
+        if campus_id is None:
+            continue
+        if pending is not None:
+            pending.add(campus_id)
+        else:
+            data_changed(campus_id)
+
+
+@receiver(pre_save, sender=Building)
+@receiver(pre_save, sender=Room)
+@receiver(pre_save, sender=Poi)
+def remember_previous_campus(sender, instance, raw=False, **kwargs):
+    # An object moved to another campus changes the data of both.
+    instance._previous_campus_id = None
+    if raw or instance.pk is None:
+        return
+    previous = sender.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._previous_campus_id = campus_id_of(previous)
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Poi)
+def campus_object_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _changed(campus_id_of(instance), getattr(instance, "_previous_campus_id", None))
+
+
+@receiver(post_delete, sender=Building)
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Poi)
+def campus_object_deleted(sender, instance, **kwargs):
+    _changed(campus_id_of(instance))
+
+
+@receiver(request_finished)
+def rebuild_search_indexes(sender, **kwargs):
+    # Sent once the response has been delivered, so the rebuild does not
+    # add to the latency of the search that found the index outdated.
+    fuzzy.rebuild_pending_indexes()
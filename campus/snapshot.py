@@ -0,0 +1,316 @@
+"""
+Memory-mapped snapshots of campus data shared by all worker processes.
+
+A snapshot is one binary file per campus and data version. It holds
+fixed-width records of buildings, rooms and POIs, the fuzzy search index
+(sorted vocabulary, postings and trigram lists, see ``campus.fuzzy``), and a
+pool of UTF-8 strings that the records point into. The file is written to a
+temporary name and renamed into place, so readers only ever see complete
+files.
+
+Workers ``mmap`` the file and read records in place. The pages live in the
+OS page cache, so every process on the host shares one copy. A freshly
+started worker can serve from the file without parsing it first. When the
+campus' data version changes, a worker switches to the new file once it has
+been written by ``manage.py build_snapshot`` or the ``campus.build_snapshot``
+job. Until then it reads the database. Replaced files are unlinked, but a
+process that still maps one keeps reading it until it lets go.
+
+Snapshots are only used when ``SNAPSHOT_DIR`` is configured.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from bisect import bisect_left
+from collections.abc import Sequence
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from campus_navigator.metrics import record_cache
+
+from .cache import get_data_version
+from .fuzzy import FuzzyIndex, build_index
+
+MAGIC = b"CAMPSNAP"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<8sIIqq")   # magic, format version, section count, campus id, data version
+SECTION = struct.Struct("<QQ")      # offset, item count
+BUILDING = struct.Struct("<qdd6I")  # id, lat, lng; name, code, address as (offset, length)
+ROOM = struct.Struct("<qqi4x2I")    # id, building id, floor; number
+POI = struct.Struct("<qqdd6I")      # id, building id (0 if none), lat, lng; title, type, info
+SPAN = struct.Struct("<4I")         # string (offset, length), first item, item count
+
+BUILDINGS, ROOMS, POIS, STRINGS, WORDS, POSTING_KINDS, POSTING_PKS, TRIGRAMS, TRIGRAM_POSITIONS = range(9)
+ITEM_SIZES = (BUILDING.size, ROOM.size, POI.size, 1, SPAN.size, 1, 8, SPAN.size, 4)
+
+KINDS = ("building", "room", "poi")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _StringPool:
+    def __init__(self):
+        self.data = bytearray()
+        self._spans = {}
+
+    def add(self, text):
+        text = text or ""
+        span = self._spans.get(text)
+        if span is None:
+            encoded = text.encode()
+            span = self._spans[text] = (len(self.data), len(encoded))
+            self.data += encoded
+        return span
+
+
+def pack(campus_id, version, buildings, rooms, pois, index):
+    """
+    Serialise campus data into the snapshot format.
+
+    ``buildings``, ``rooms`` and ``pois`` are rows as selected by
+    ``write_snapshot``; ``index`` is a ``FuzzyIndex``.
+    """
+    strings = _StringPool()
+    sections = [bytearray() for _ in ITEM_SIZES]
+
+    for pk, lat, lng, name, code, address in buildings:
+        sections[BUILDINGS] += BUILDING.pack(pk, lat, lng, *strings.add(name), *strings.add(code), *strings.add(address))
+    for pk, building_id, floor, number in rooms:
+        sections[ROOMS] += ROOM.pack(pk, building_id, floor, *strings.add(number))
+    for pk, building_id, lat, lng, title, type_, info in pois:
+        sections[POIS] += POI.pack(
+            pk, building_id or 0, lat, lng, *strings.add(title), *strings.add(type_), *strings.add(info),
+        )
+
+    kinds = {kind: number for number, kind in enumerate(KINDS)}
+    first = 0
+    for word in index.words:
+        refs = sorted(index.refs(word))
+        sections[WORDS] += SPAN.pack(*strings.add(word), first, len(refs))
+        sections[POSTING_KINDS] += bytes(kinds[kind] for kind, _ in refs)
+        sections[POSTING_PKS] += struct.pack(f"<{len(refs)}q", *(pk for _, pk in refs))
+        first += len(refs)
+    first = 0
+    for gram in sorted(index.trigram_postings):
+        positions = index.trigram_postings[gram]
+        sections[TRIGRAMS] += SPAN.pack(*strings.add(gram), first, len(positions))
+        sections[TRIGRAM_POSITIONS] += struct.pack(f"<{len(positions)}I", *positions)
+        first += len(positions)
+    sections[STRINGS] = strings.data
+
+    out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), campus_id, version))
+    out += bytes(SECTION.size * len(sections))
+    for number, (data, size) in enumerate(zip(sections, ITEM_SIZES)):
+        # Keep every section 8-byte aligned for memoryview.cast().
+        out += bytes(-len(out) % 8)
+        SECTION.pack_into(out, HEADER.size + SECTION.size * number, len(out), len(data) // size)
+        out += data
+    return out
+
+
+class Snapshot:
+    """A memory-mapped snapshot file; records are decoded on access."""
+
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise SnapshotError("snapshots are only mapped on little-endian hosts")
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # empty file
+                raise SnapshotError(f"{path}: {e}") from e
+        self._buffer = memoryview(self._mmap)
+        if len(self._buffer) < HEADER.size:
+            raise SnapshotError(f"{path}: truncated header")
+        magic, format_version, count, self.campus_id, self.version = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or format_version != FORMAT_VERSION or count != len(ITEM_SIZES):
+            raise SnapshotError(f"{path}: not a campus snapshot of format {FORMAT_VERSION}")
+        self._sections = [
+            SECTION.unpack_from(self._buffer, HEADER.size + SECTION.size * number) for number in range(count)
+        ]
+        for (offset, items), size in zip(self._sections, ITEM_SIZES):
+            if offset + items * size > len(self._buffer):
+                raise SnapshotError(f"{path}: truncated section")
+        self._strings_offset = self._sections[STRINGS][0]
+        self._search_index = None
+        self._lock = threading.Lock()
+
+    def section(self, number):
+        """Zero-copy view of a section's bytes."""
+        offset, items = self._sections[number]
+        return self._buffer[offset:offset + items * ITEM_SIZES[number]]
+
+    def array(self, number, fmt):
+        """A section of plain numbers as a zero-copy typed view."""
+        return self.section(number).cast(fmt)
+
+    def string(self, offset, length):
+        start = self._strings_offset + offset
+        return str(self._buffer[start:start + length], "utf-8")
+
+    def _strings(self, spans):
+        return [self.string(spans[i], spans[i + 1]) for i in range(0, len(spans), 2)]
+
+    def buildings(self):
+        for pk, lat, lng, *spans in BUILDING.iter_unpack(self.section(BUILDINGS)):
+            name, code, address = self._strings(spans)
+            yield {"id": pk, "name": name, "code": code, "address": address, "lat": lat, "lng": lng}
+
+    def rooms(self):
+        for pk, building_id, floor, *spans in ROOM.iter_unpack(self.section(ROOMS)):
+            yield {"id": pk, "building_id": building_id, "floor": floor, "number": self.string(*spans)}
+
+    def pois(self):
+        for pk, building_id, lat, lng, *spans in POI.iter_unpack(self.section(POIS)):
+            title, type_, info = self._strings(spans)
+            yield {
+                "id": pk, "building_id": building_id or None,
+                "title": title, "type": type_, "lat": lat, "lng": lng, "info": info,
+            }
+
+    def search_index(self):
+        with self._lock:
+            if self._search_index is None:
+                self._search_index = PackedFuzzyIndex(self)
+            return self._search_index
+
+
+class _Spans(Sequence):
+    """Sorted strings of a ``SPAN`` section, decoded on access."""
+
+    def __init__(self, snapshot, number):
+        self._snapshot = snapshot
+        self._data = snapshot.section(number)
+        self._len = len(self._data) // SPAN.size
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        offset, length, _, _ = SPAN.unpack_from(self._data, i * SPAN.size)
+        return self._snapshot.string(offset, length)
+
+    def find(self, text):
+        """``(first, count)`` of the items attached to ``text``, or ``None``."""
+        i = bisect_left(self, text)
+        if i == self._len or self[i] != text:
+            return None
+        return SPAN.unpack_from(self._data, i * SPAN.size)[2:]
+
+
+class PackedFuzzyIndex(FuzzyIndex):
+    """``FuzzyIndex`` reading its vocabulary and postings from a snapshot."""
+
+    def __init__(self, snapshot):
+        self.words = _Spans(snapshot, WORDS)
+        self._trigrams = _Spans(snapshot, TRIGRAMS)
+        self._kinds = snapshot.array(POSTING_KINDS, "B")
+        self._pks = snapshot.array(POSTING_PKS, "q")
+        self._positions = snapshot.array(TRIGRAM_POSITIONS, "I")
+
+    def has_word(self, word):
+        return self.words.find(word) is not None
+
+    def refs(self, word):
+        found = self.words.find(word)
+        if found is None:
+            return ()
+        first, count = found
+        return [(KINDS[self._kinds[i]], self._pks[i]) for i in range(first, first + count)]
+
+    def trigram_positions(self, gram):
+        found = self._trigrams.find(gram)
+        if found is None:
+            return ()
+        first, count = found
+        return self._positions[first:first + count]
+
+
+def enabled():
+    return bool(getattr(settings, "SNAPSHOT_DIR", None))
+
+
+def snapshot_path(campus_id, version):
+    return Path(settings.SNAPSHOT_DIR) / f"campus-{campus_id}-v{version}.snap"
+
+
+def write_snapshot(campus_id):
+    """Write the snapshot of the campus' current data version and return its path."""
+    from .models import Building, Poi, Room
+
+    # One transaction gives a consistent view of the data and its version.
+    with transaction.atomic():
+        version = get_data_version(campus_id)
+        buildings = Building.objects.filter(campus_id=campus_id).values_list(
+            "id", "lat", "lng", "name", "code", "address",
+        )
+        rooms = Room.objects.filter(building__campus_id=campus_id).values_list("id", "building_id", "floor", "number")
+        # Same rows and order as the database branch of build_pois_payload.
+        pois = Poi.objects.filter(campus_id=campus_id).values_list(
+            "id", "building_id", "lat", "lng", "title", "type", "info",
+        )
+        data = pack(campus_id, version, buildings.iterator(), rooms.iterator(), pois.iterator(), build_index(campus_id))
+
+    path = snapshot_path(campus_id, version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+    for old in path.parent.glob(f"campus-{campus_id}-v*.snap"):
+        try:
+            old_version = int(old.stem.rsplit("-v", 1)[1])
+        except ValueError:
+            continue
+        if old_version < version:
+            old.unlink(missing_ok=True)
+    return path
+
+
+_lock = threading.Lock()
+_mapped = {}
+
+
+def current_snapshot(campus_id, version):
+    """
+    The mapped snapshot of the campus at ``version``, or ``None`` when it has
+    not been written (yet); callers then read the database.
+    """
+    if not enabled():
+        return None
+    with _lock:
+        snapshot = _mapped.get(campus_id)
+        if snapshot is None or snapshot.version != version:
+            # The previous mapping is released once no request uses it.
+            _mapped.pop(campus_id, None)
+            try:
+                snapshot = Snapshot(snapshot_path(campus_id, version))
+            except (FileNotFoundError, SnapshotError):
+                snapshot = None
+            if snapshot is not None and (snapshot.campus_id, snapshot.version) == (campus_id, version):
+                _mapped[campus_id] = snapshot
+            else:
+                snapshot = None
+        record_cache("snapshot", snapshot is not None)
+        return snapshot
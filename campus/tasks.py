@@ -0,0 +1,15 @@
+from jobs.queue import register
+
+from .cache import warm_caches
+from .snapshot import enabled, write_snapshot
+
+
+@register("campus.warm_caches")
+def warm_caches_job(campus_id=None):
+    warm_caches(campus_id)
+
+
+@register("campus.build_snapshot")
+def build_snapshot_job(campus_id):
+    if enabled():
+        write_snapshot(campus_id)
@@ -1,10 +1,40 @@
+import gzip
 import json
+import os
+import random
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
 
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 
-from campus.models import Building, FavoritePoi, Poi, Room
+from campus import fuzzy, snapshot
+from campus.cache import build_pois_payload, get_data_version, pois_payload
+from campus.fuzzy import FuzzyIndex, bounded_levenshtein, build_index, query_variants
+from campus.models import Building, Campus, FavoritePoi, Poi, Room, default_campus, default_campus_id
+from campus.roomcodes import normalize_key, parse_room_code, resolve_room_code
+from campus.snapshot import PackedFuzzyIndex, Snapshot, current_snapshot, snapshot_path, write_snapshot
+from campus_navigator import metrics
+from campus_navigator.compression import available_encodings, choose_encoding
+from jobs.models import Job
+from jobs.worker import Worker
+
+
+def forget_search_indexes(test):
+    # Indexes live in the process and outlast the test's database, where the
+    # same data versions come round again.
+    for registry in (fuzzy._cached, fuzzy._pending):
+        registry.clear()
+        test.addCleanup(registry.clear)
 
 
 class ModelsTestCase(TestCase):
@@ -101,9 +131,31 @@ class PoisJsonTestCase(TestCase):
         self.assertIn("lat", data[0])
         self.assertIn("lng", data[0])
 
+    def test_previous_payload_is_served_until_worker_publishes(self):
+        url = reverse("pois_json")
+        Poi.objects.create(title="Вход", type="entrance", lat=55.78, lng=37.63)
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Poi.objects.create(title="Столовая", type="canteen", lat=55.78, lng=37.63)
+        # Campus, published payload and data version; the POIs are not read.
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.client.get(url).json()), 1)
+
+        Job.objects.update(run_after=timezone.now())
+        Worker().run(burst=True)
+        self.assertEqual(len(self.client.get(url).json()), 2)
+
+    def test_request_rebuilds_when_worker_is_overdue(self):
+        url = reverse("pois_json")
+        self.client.get(url)
+        Poi.objects.create(title="Вход", type="entrance", lat=55.78, lng=37.63)
+        with self.settings(CAMPUS_PUBLISH_GRACE=-1):
+            self.assertEqual(len(self.client.get(url).json()), 1)
+
 
 class SearchViewTestCase(TestCase):
     def setUp(self):
+        forget_search_indexes(self)
         self.building = Building.objects.create(
             name="Главный корпус",
             code="Гл",
@@ -246,6 +298,7 @@ class PoiManagementTestCase(TestCase):
 
 class SearchTemplateTestCase(TestCase):
     def setUp(self):
+        forget_search_indexes(self)
         self.building = Building.objects.create(
             name="Учебный корпус",
             code="УК",
@@ -274,3 +327,507 @@ class SearchTemplateTestCase(TestCase):
     def test_search_template_renders_objects(self):
         response = self.client.get(reverse("search"), {"q": "Буфет"})
         self.assertContains(response, "Буфет")
+
+
+class CompressionTestCase(TestCase):
+    def setUp(self):
+        forget_search_indexes(self)
+        caches["compression"].clear()
+        b = Building.objects.create(name="Корпус Г", code="Г", lat=55.79, lng=37.64)
+        for i in range(50):
+            Poi.objects.create(
+                building=b,
+                title=f"Аудитория {i}",
+                type="room",
+                lat=55.79 + i / 10000,
+                lng=37.64,
+                info="Учебная аудитория",
+            )
+
+    def test_large_json_is_gzipped(self):
+        response = self.client.get(reverse("pois_json"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data), 50)
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(reverse("pois_json"), HTTP_ACCEPT_ENCODING="gzip")
+        second = self.client.get(reverse("pois_json"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(first.compression_cache_hit)
+        self.assertTrue(second.compression_cache_hit)
+        self.assertEqual(first.content, second.content)
+
+    def test_pages_with_csrf_token_are_not_cached(self):
+        for _ in range(2):
+            response = self.client.get(reverse("map"), HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertFalse(hasattr(response, "compression_cache_hit"))
+        self.assertEqual(len(caches["compression"]._cache), 0)
+
+    def test_repeated_search_is_served_from_cache(self):
+        url = reverse("search")
+        first = self.client.get(url, {"q": "Аудитория"}, HTTP_ACCEPT_ENCODING="gzip")
+        second = self.client.get(url, {"q": "Аудитория"}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertIn("Cookie", second["Vary"])
+        self.assertFalse(first.compression_cache_hit)
+        self.assertTrue(second.compression_cache_hit)
+
+    def test_identity_when_not_accepted(self):
+        response = self.client.get(reverse("pois_json"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_tiny_response_is_not_compressed(self):
+        Poi.objects.all().delete()
+        response = self.client.get(reverse("pois_json"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_choose_encoding_respects_q_values(self):
+        self.assertIsNone(choose_encoding("gzip;q=0"))
+        self.assertIsNone(choose_encoding("identity"))
+        self.assertEqual(choose_encoding("deflate, gzip;q=0.5")[0], "gzip")
+        self.assertEqual(choose_encoding("*")[0], available_encodings()[0][0])
+
+
+def metrics_text():
+    return metrics.render(*metrics.merge(metrics.collect()))
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        Building.objects.create(name="Корпус Д", code="Д", lat=55.8, lng=37.65)
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+
+    def test_view_latency_and_queries_are_recorded(self):
+        self.client.get(reverse("pois_json"))
+        self.client.get(reverse("map"))
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('campus_http_request_duration_seconds_count{view="pois_json"} 1', body)
+        self.assertIn('campus_http_requests_total{view="map",method="GET",status="200"} 1', body)
+        self.assertIn('campus_db_queries_per_request_count{view="map"} 1', body)
+
+    def test_compression_cache_counters(self):
+        for i in range(40):
+            Poi.objects.create(title=f"Точка {i}", type="point", lat=55.8, lng=37.65, info="x" * 20)
+        self.client.get(reverse("pois_json"), HTTP_ACCEPT_ENCODING="gzip")
+        self.client.get(reverse("pois_json"), HTTP_ACCEPT_ENCODING="gzip")
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('campus_cache_requests_total{cache="compression",result="hit"} 1', body)
+
+    def test_dumps_from_several_workers_are_merged(self):
+        self.client.get(reverse("pois_json"))
+        dump = metrics.registry.dump()
+        counters, histograms = metrics.merge([dump, dump])
+        key = ("campus_http_request_duration_seconds", (("view", "pois_json"),))
+        self.assertEqual(sum(histograms[key][:-1]), 2)
+
+    def test_worker_files_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = {"counters": [["campus_cache_requests_total", [["cache", "pois"], ["result", "miss"]], 3]],
+                     "histograms": []}
+            Path(directory, "metrics-99999.json").write_text(json.dumps(other))
+            with self.settings(METRICS_DIR=directory):
+                body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('campus_cache_requests_total{cache="pois",result="miss"} 3', body)
+
+    def test_stale_worker_files_are_archived(self):
+        def misses():
+            counters, _ = metrics.merge(metrics.collect())
+            return counters.get(("campus_cache_requests_total", (("cache", "pois"), ("result", "miss"))), 0)
+
+        def age(path):
+            old = time.time() - 3600
+            os.utime(path, (old, old))
+
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory, METRICS_STALE_AFTER=60):
+            dead = Path(directory, "metrics-99999.json")
+            dead.write_text(json.dumps({
+                "counters": [["campus_cache_requests_total", [["cache", "pois"], ["result", "miss"]], 3]],
+                "histograms": [],
+            }))
+            self.assertEqual(misses(), 3)
+            age(dead)
+            self.assertEqual(misses(), 3)
+            self.assertFalse(dead.exists())
+
+            # This worker goes idle, its file is archived, then it serves again.
+            metrics.record_cache("pois", False)
+            self.assertEqual(misses(), 4)
+            own = Path(directory, f"metrics-{os.getpid()}.json")
+            # Stale right after collect() refreshed it.
+            with self.settings(METRICS_STALE_AFTER=-1):
+                self.assertEqual(misses(), 4)
+            self.assertEqual(misses(), 4)
+            metrics.record_cache("pois", False)
+            self.assertEqual(misses(), 5)
+            self.assertEqual(
+                sorted(p.name for p in Path(directory).glob("*.json")), ["archived.json", own.name],
+            )
+
+    def test_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="10.1.2.3").status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        with self.settings(METRICS_ALLOWED_IPS=["10.1.2.3"]):
+            self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="10.1.2.3").status_code, 200)
+
+    def test_concurrent_flushes(self):
+        errors = []
+
+        def flush(directory):
+            for _ in range(50):
+                try:
+                    metrics.registry.flush(directory)
+                except Exception as e:
+                    errors.append(e)
+
+        with tempfile.TemporaryDirectory() as directory:
+            threads = [threading.Thread(target=flush, args=(directory,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual([p.name for p in Path(directory).iterdir()], [f"metrics-{os.getpid()}.json"])
+
+    def test_flush_errors_do_not_break_requests(self):
+        with tempfile.NamedTemporaryFile() as not_a_directory:
+            with self.settings(METRICS_DIR=not_a_directory.name), self.assertLogs("campus_navigator.metrics"):
+                response = self.client.get(reverse("pois_json"))
+        self.assertEqual(response.status_code, 200)
+
+
+class RoomCodeTestCase(TestCase):
+    def setUp(self):
+        forget_search_indexes(self)
+        self.main = Building.objects.create(name="Главный корпус", code="Гл", lat=55.75, lng=37.61)
+        self.iit = Building.objects.create(name="Институт ИТ", code="ИИТ", lat=55.76, lng=37.62)
+        self.second = Building.objects.create(name="2 корпус", code="2к", lat=55.77, lng=37.63)
+        self.room = Room.objects.create(building=self.main, number="305", floor=3)
+        Room.objects.create(building=self.iit, number="305", floor=3)
+        self.suffixed = Room.objects.create(building=self.iit, number="214а", floor=2)
+        self.numbered = Room.objects.create(building=self.second, number="101", floor=1)
+
+    def test_parse_common_formats(self):
+        self.assertEqual(parse_room_code("Гл-305"), ("Гл", "305"))
+        self.assertEqual(parse_room_code("ИИТ 214"), ("ИИТ", "214"))
+        self.assertEqual(parse_room_code("2к305"), ("2к", "305"))
+        self.assertEqual(parse_room_code("ауд. 101а"), (None, "101а"))
+        self.assertEqual(parse_room_code("305 (Гл)"), ("Гл", "305"))
+        self.assertIsNone(parse_room_code("Главный корпус"))
+
+    def test_latin_lookalikes_are_folded(self):
+        self.assertEqual(normalize_key("A-101"), normalize_key("а101"))
+        self.assertEqual(normalize_key("214 a"), normalize_key("214А"))
+
+    def test_resolve_exact_room(self):
+        response = self.client.get(reverse("resolve_room"), {"q": "гл.305"})
+        data = response.json()
+        self.assertEqual(len(data["matches"]), 1)
+        self.assertEqual(data["room"]["id"], self.room.id)
+
+    def test_resolve_with_latin_letters_and_suffix(self):
+        data = self.client.get(reverse("resolve_room"), {"q": "ИИТ 214a"}).json()
+        self.assertEqual(data["room"]["id"], self.suffixed.id)
+        data = self.client.get(reverse("resolve_room"), {"q": "2K-101"}).json()
+        self.assertEqual(data["room"]["id"], self.numbered.id)
+
+    def test_number_only_lists_every_building(self):
+        data = self.client.get(reverse("resolve_room"), {"q": "305"}).json()
+        self.assertEqual(len(data["matches"]), 2)
+        self.assertIsNone(data["room"])
+
+    def test_unparsable_code_returns_400(self):
+        response = self.client.get(reverse("resolve_room"), {"q": "столовая"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_room_number_unique_per_building(self):
+        with self.assertRaises(IntegrityError):
+            Room.objects.create(building=self.main, number="305")
+
+    def test_latin_lookalike_number_is_a_duplicate(self):
+        with self.assertRaises(ValidationError):
+            Room(building=self.iit, number="214a").full_clean()
+        with self.assertRaises(IntegrityError):
+            Room.objects.create(building=self.iit, number="214a")
+
+    def test_update_fields_refreshes_keys(self):
+        self.room.number = "306б"
+        self.room.save(update_fields=["number"])
+        self.main.code = "A"
+        self.main.save(update_fields=["code"])
+        self.assertTrue(Room.objects.filter(pk=self.room.pk, number_key="306Б").exists())
+        self.assertTrue(Building.objects.filter(pk=self.main.pk, code_key="А").exists())
+
+    def test_resolve_uses_indexes(self):
+        sql, params = resolve_room_code("Гл-305", self.main.campus_id)[1].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        self.assertIn("(building_id=? AND number_key=?)", plan)
+        self.assertNotIn("SCAN", plan)
+
+    def test_search_finds_room_by_code(self):
+        response = self.client.get(reverse("search"), {"q": "Гл-305"})
+        self.assertEqual(list(response.context["rooms"]), [self.room])
+
+
+class FuzzySearchTestCase(TestCase):
+    def setUp(self):
+        forget_search_indexes(self)
+        self.building = Building.objects.create(name="Главный корпус", code="Гл", lat=55.75, lng=37.61)
+        self.canteen = Poi.objects.create(
+            building=self.building, title="Столовая", type="canteen", lat=55.75, lng=37.61
+        )
+        self.library = Poi.objects.create(
+            building=self.building, title="Научная библиотека", type="library", lat=55.75, lng=37.61
+        )
+
+    def test_layout_and_transliteration_variants(self):
+        self.assertIn("столовая", query_variants("cnjkjdfz"))
+        self.assertIn("библиотека", query_variants("biblioteka"))
+
+    def test_bounded_levenshtein(self):
+        self.assertEqual(bounded_levenshtein("столовая", "стловая", 2), 1)
+        self.assertEqual(bounded_levenshtein("столовая", "деканат", 2), 3)
+
+    def test_trigram_candidates_respect_distance_limit(self):
+        index = FuzzyIndex([("poi", i, word) for i, word in enumerate(["столовая", "столовка", "стадион", "деканат"])])
+        self.assertEqual(index.match_word("стловая"), {"столовая": 1})
+
+    def test_trigram_filter_finds_every_word_within_distance(self):
+        words = ["буфет", "вход", "деканат", "столовая"]
+        index = FuzzyIndex([("poi", i, word) for i, word in enumerate(words)])
+        self.assertEqual(index.match_word("ьуфет"), {"буфет": 1})
+        self.assertEqual(index.match_word("фход"), {"вход": 1})
+
+        rng = random.Random(1)
+        alphabet = "абвгд"
+        vocabulary = {"".join(rng.choices(alphabet, k=rng.randint(1, 8))) for _ in range(300)}
+        index = FuzzyIndex([("poi", i, word) for i, word in enumerate(vocabulary)])
+        for _ in range(300):
+            query = "".join(rng.choices(alphabet, k=rng.randint(1, 8)))
+            for limit in (1, 2):
+                expected = {
+                    word: bounded_levenshtein(query, word, limit)
+                    for word in vocabulary
+                    if bounded_levenshtein(query, word, limit) <= limit
+                }
+                self.assertEqual(dict(index._similar(query, limit)), expected, (query, limit))
+
+    def test_wrong_layout_query_finds_poi(self):
+        response = self.client.get(reverse("search"), {"q": "cnjkjdfz"})
+        self.assertEqual(response.context["pois"], [self.canteen])
+        self.assertTrue(response.context["fuzzy"])
+        self.assertEqual(response.context["suggestion"], "столовая")
+
+    def test_typo_and_transliteration_find_poi(self):
+        response = self.client.get(reverse("search"), {"q": "библеотека"})
+        self.assertIn(self.library, response.context["pois"])
+        response = self.client.get(reverse("search"), {"q": "stolovaya"})
+        self.assertIn(self.canteen, response.context["pois"])
+
+    def test_fuzzy_tier_skipped_when_exact_results_suffice(self):
+        for i in range(3):
+            Poi.objects.create(title=f"Вход {i}", type="entrance", lat=55.75, lng=37.61)
+        with self.settings(FUZZY_SEARCH_MIN_RESULTS=3):
+            metrics.registry.reset()
+            response = self.client.get(reverse("search"), {"q": "Вход"})
+        self.assertFalse(response.context["fuzzy"])
+        self.assertNotIn("fuzzy_index", metrics_text())
+
+    def test_rebuild_on_one_campus_does_not_block_another(self):
+        north = Campus.objects.create(name="Северный кампус", slug="north")
+        with fuzzy._build_lock(north.id):
+            response = self.client.get(reverse("search"), {"q": "стловая"})
+        self.assertEqual(response.context["pois"], [self.canteen])
+
+    def test_index_is_rebuilt_after_data_change(self):
+        self.client.get(reverse("search"), {"q": "деканта"})
+        old_index = fuzzy.get_index(self.canteen.campus_id)
+        dean = Poi.objects.create(title="Деканат", type="office", lat=55.75, lng=37.61)
+
+        # The search that notices the change is answered from the old index
+        # and the new one is built after its response has been sent.
+        response = self.client.get(reverse("search"), {"q": "деканта"})
+        self.assertNotIn(dean, response.context["pois"])
+        self.assertIsNot(fuzzy.get_index(self.canteen.campus_id), old_index)
+        response = self.client.get(reverse("search"), {"q": "деканта"})
+        self.assertIn(dean, response.context["pois"])
+
+
+class SeedPerfDataTestCase(TestCase):
+    def test_seed_and_clear_bump_data_version_once(self):
+        campus_id = default_campus_id()
+        version = get_data_version(campus_id)
+        call_command("seed_perf_data", "--buildings", "3", "--rooms", "30", "--pois", "50", stdout=StringIO())
+        self.assertEqual(Poi.objects.count(), 50)
+        self.assertEqual(len(json.loads(pois_payload(campus_id))), 50)
+        self.assertEqual(Room.objects.filter(number_key="105").count(), 3)
+        self.assertEqual(get_data_version(campus_id), version + 1)
+
+        call_command("seed_perf_data", "--clear", stdout=StringIO())
+        self.assertEqual(Building.objects.count(), 0)
+        self.assertEqual(Poi.objects.count(), 0)
+        self.assertEqual(json.loads(pois_payload(campus_id)), [])
+        self.assertEqual(get_data_version(campus_id), version + 2)
+
+
+class MultiCampusTestCase(TestCase):
+    def setUp(self):
+        forget_search_indexes(self)
+        self.main = default_campus()
+        self.north = Campus.objects.create(name="Северный кампус", slug="north", lat=54.4, lng=48.4)
+        self.main_building = Building.objects.create(campus=self.main, name="Главный корпус", code="Гл", lat=55.75, lng=37.61)
+        self.north_building = Building.objects.create(campus=self.north, name="Северный корпус", code="Гл", lat=54.4, lng=48.4)
+        Room.objects.create(building=self.main_building, number="305")
+        self.north_room = Room.objects.create(building=self.north_building, number="305")
+        Poi.objects.create(building=self.main_building, title="Столовая", type="canteen", lat=55.75, lng=37.61)
+        self.north_poi = Poi.objects.create(
+            building=self.north_building, title="Столовая Север", type="canteen", lat=54.4, lng=48.4
+        )
+
+    def test_poi_takes_campus_from_building(self):
+        self.assertEqual(self.north_poi.campus, self.north)
+
+    def test_unsaved_objects_cost_no_queries(self):
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                Poi(title="Точка", type="point", lat=55.75, lng=37.61)
+                Building(name="Корпус", lat=55.75, lng=37.61)
+
+    def test_objects_without_campus_go_to_default(self):
+        building = Building.objects.create(name="Корпус без кампуса", lat=1, lng=1)
+        self.assertEqual(building.campus, self.main)
+
+    def test_pois_json_is_scoped(self):
+        data = self.client.get(reverse("campus_pois_json", args=["north"])).json()
+        self.assertEqual([p["id"] for p in data], [self.north_poi.id])
+        data = self.client.get(reverse("pois_json")).json()
+        self.assertNotIn(self.north_poi.id, [p["id"] for p in data])
+
+    def test_map_centres_on_campus(self):
+        response = self.client.get(reverse("campus_map", args=["north"]))
+        self.assertEqual(response.context["campus"], self.north)
+        self.assertAlmostEqual(response.context["center_lat"], 54.4)
+
+    def test_unknown_campus_is_404(self):
+        self.assertEqual(self.client.get(reverse("campus_map", args=["nowhere"])).status_code, 404)
+
+    def test_search_and_resolver_are_scoped(self):
+        response = self.client.get(reverse("campus_search", args=["north"]), {"q": "Столовая"})
+        self.assertEqual(response.context["pois"], [self.north_poi])
+        data = self.client.get(reverse("campus_resolve_room", args=["north"]), {"q": "Гл-305"}).json()
+        self.assertEqual(data["room"]["id"], self.north_room.id)
+
+    def test_edit_bumps_only_own_campus_version(self):
+        main_version = get_data_version(self.main.id)
+        north_version = get_data_version(self.north.id)
+        Poi.objects.create(building=self.north_building, title="Вход", type="entrance", lat=54.4, lng=48.4)
+        self.assertEqual(get_data_version(self.main.id), main_version)
+        self.assertEqual(get_data_version(self.north.id), north_version + 1)
+
+    def test_moving_building_bumps_both_campuses(self):
+        main_version = get_data_version(self.main.id)
+        north_version = get_data_version(self.north.id)
+        self.north_building.campus = self.main
+        self.north_building.save()
+        self.assertEqual(get_data_version(self.main.id), main_version + 1)
+        self.assertEqual(get_data_version(self.north.id), north_version + 1)
+
+    def test_moving_building_moves_its_pois(self):
+        self.north_building.campus = self.main
+        self.north_building.save()
+        self.north_poi.refresh_from_db()
+        self.assertEqual(self.north_poi.campus, self.main)
+        data = self.client.get(reverse("campus_pois_json", args=["main"])).json()
+        self.assertIn(self.north_poi.id, [p["id"] for p in data])
+        data = self.client.get(reverse("campus_pois_json", args=["north"])).json()
+        self.assertEqual(data, [])
+
+    def test_campuses_json(self):
+        slugs = [c["slug"] for c in self.client.get(reverse("campuses_json")).json()]
+        self.assertEqual(sorted(slugs), ["main", "north"])
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        override = self.settings(SNAPSHOT_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        forget_search_indexes(self)
+        snapshot._mapped.clear()
+        self.addCleanup(snapshot._mapped.clear)
+
+        self.campus_id = default_campus_id()
+        building = Building.objects.create(
+            name="Главный корпус", code="Гл", address="Университетская, 1", lat=55.75, lng=37.61
+        )
+        Room.objects.create(building=building, number="305", floor=3)
+        self.canteen = Poi.objects.create(
+            building=building, title="Столовая", type="canteen", lat=55.75, lng=37.61, info="2 этаж"
+        )
+        Poi.objects.create(title="Вход", type="entrance", lat=55.7501, lng=37.6102)
+
+    def version(self):
+        return get_data_version(self.campus_id)
+
+    def test_round_trip(self):
+        mapped = Snapshot(write_snapshot(self.campus_id))
+        self.assertEqual((mapped.campus_id, mapped.version), (self.campus_id, self.version()))
+        self.assertEqual([b["address"] for b in mapped.buildings()], ["Университетская, 1"])
+        self.assertEqual([(r["number"], r["floor"]) for r in mapped.rooms()], [("305", 3)])
+        self.assertEqual(build_pois_payload(self.campus_id, mapped), build_pois_payload(self.campus_id))
+
+    def test_packed_index_matches_in_memory_index(self):
+        write_snapshot(self.campus_id)
+        packed = current_snapshot(self.campus_id, self.version()).search_index()
+        built = build_index(self.campus_id)
+        for query in ["cnjkjdfz", "библеотека", "стловая", "305", "гл", "stolovaya", "нет такого"]:
+            self.assertEqual(packed.search(query), built.search(query), query)
+
+    def test_views_read_from_snapshot(self):
+        call_command("build_snapshot", stdout=StringIO())
+        metrics.registry.reset()
+        data = self.client.get(reverse("pois_json")).json()
+        self.assertEqual({p["title"] for p in data}, {"Столовая", "Вход"})
+        response = self.client.get(reverse("search"), {"q": "стловая"})
+        self.assertEqual(response.context["pois"], [self.canteen])
+        self.assertIsInstance(fuzzy.get_index(self.campus_id), PackedFuzzyIndex)
+        self.assertIn('campus_cache_requests_total{cache="snapshot",result="hit"} 2', metrics_text())
+
+    def test_switches_to_new_version_without_restart(self):
+        write_snapshot(self.campus_id)
+        old = current_snapshot(self.campus_id, self.version())
+        dean = Poi.objects.create(title="Деканат", type="office", lat=55.75, lng=37.61)
+
+        # Until the new snapshot is written the database is used.
+        self.assertIsNone(current_snapshot(self.campus_id, self.version()))
+        self.assertIn(dean, self.client.get(reverse("search"), {"q": "деканта"}).context["pois"])
+
+        write_snapshot(self.campus_id)
+        new = current_snapshot(self.campus_id, self.version())
+        self.assertIn("Деканат", [p["title"] for p in new.pois()])
+        self.assertFalse(old.path.exists())
+        # A mapping still in use stays readable after its file is replaced.
+        self.assertEqual(len(list(old.pois())), 2)
+        self.assertEqual(list(self.directory.glob("*.tmp")), [])
+
+    def test_invalid_file_falls_back_to_database(self):
+        path = snapshot_path(self.campus_id, self.version())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"not a snapshot")
+        self.assertIsNone(current_snapshot(self.campus_id, self.version()))
+        self.assertEqual(len(self.client.get(reverse("pois_json")).json()), 2)
+
+    def test_data_change_rebuilds_snapshot_in_background(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Poi.objects.create(title="Деканат", type="office", lat=55.75, lng=37.61)
+        Job.objects.update(run_after=timezone.now())
+        Worker().run(burst=True)
+        self.assertTrue(snapshot_path(self.campus_id, self.version()).exists())
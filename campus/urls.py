@@ -1,12 +1,22 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
 
+# The same pages and APIs scoped to one campus: /c/<slug>/...
+campus_patterns = [
+    path("", views.map_view, name="campus_map"),
+    path("api/pois/", views.pois_json, name="campus_pois_json"),
+    path("search/", views.search_view, name="campus_search"),
+    path("api/rooms/resolve/", views.resolve_room, name="campus_resolve_room"),
+]
+
 urlpatterns = [
     path("", views.map_view, name="map"),
     path("api/pois/", views.pois_json, name="pois_json"),
     path("search/", views.search_view, name="search"),
+    path("api/rooms/resolve/", views.resolve_room, name="resolve_room"),
+    path("api/campuses/", views.campuses_json, name="campuses_json"),
     path("api/poi/create/", views.create_poi, name="create_poi"),
     path("api/favorite/toggle/", views.toggle_favorite, name="toggle_favorite"),
     path("api/favorites/", views.favorites_json, name="favorites_json"),
+    path("c/<slug:campus_slug>/", include(campus_patterns)),
 ]
- 
\ No newline at end of file
@@ -1,31 +1,39 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import user_passes_test
 from django.views.decorators.http import require_http_methods
-from .models import Building, FavoritePoi, Room, Poi
+from .cache import pois_payload
+from .fuzzy import fuzzy_search
+from .models import Building, Campus, FavoritePoi, Room, Poi, default_campus
+from .roomcodes import resolve_room_code
 from django.contrib.auth.decorators import login_required
 import json
 
 
-def map_view(request):
+def get_campus(campus_slug):
+    """Campus from the URL, or the default one for the unscoped URLs."""
+    if campus_slug is None:
+        return default_campus()
+    return get_object_or_404(Campus, slug=campus_slug)
+
+
+def map_view(request, campus_slug=None):
+    campus = get_campus(campus_slug)
     poi_id = request.GET.get("poi_id")
     selected_poi = None
 
     if poi_id:
-        try:
-            selected_poi = Poi.objects.get(id=poi_id)
-            center_lat = selected_poi.lat
-            center_lng = selected_poi.lng
-        except Poi.DoesNotExist:
-            building = Building.objects.first()
-            if building:
-                center_lat = building.lat
-                center_lng = building.lng
-            else:
-                center_lat = 55.75
-                center_lng = 37.61
+        selected_poi = Poi.objects.filter(campus=campus, id=poi_id).first()
+
+    if selected_poi:
+        center_lat = selected_poi.lat
+        center_lng = selected_poi.lng
+    elif campus.lat is not None and campus.lng is not None:
+        center_lat = campus.lat
+        center_lng = campus.lng
     else:
-        building = Building.objects.first()
+        building = campus.buildings.order_by("id").first()
         if building:
             center_lat = building.lat
             center_lng = building.lng
@@ -34,6 +42,7 @@ def map_view(request):
             center_lng = 37.61
 
     context = {
+        "campus": campus,
         "center_lat": center_lat,
         "center_lng": center_lng,
         "selected_poi_id": selected_poi.id if selected_poi else None,
@@ -41,29 +50,83 @@ def map_view(request):
     return render(request, "campus/map.html", context)
 
 
-def pois_json(request):
-    pois = Poi.objects.all().values("id", "title", "type", "lat", "lng", "info")
-    return JsonResponse(list(pois), safe=False)
+def campuses_json(request):
+    campuses = Campus.objects.order_by("name").values("id", "slug", "name", "lat", "lng")
+    return JsonResponse(list(campuses), safe=False)
+
 
+def pois_json(request, campus_slug=None):
+    campus = get_campus(campus_slug)
+    return HttpResponse(pois_payload(campus.id), content_type="application/json")
 
-def search_view(request):
+
+def search_view(request, campus_slug=None):
+    campus = get_campus(campus_slug)
     query = request.GET.get("q", "").strip()
     buildings = rooms = pois = []
+    fuzzy = False
+    suggestion = None
 
     if query:
-        buildings = Building.objects.filter(name__icontains=query)
-        rooms = Room.objects.filter(number__icontains=query)
-        pois = Poi.objects.filter(title__icontains=query)
+        buildings = list(Building.objects.filter(campus=campus, name__icontains=query))
+        rooms = list(
+            Room.objects.select_related("building").filter(building__campus=campus, number__icontains=query)
+        )
+        pois = list(Poi.objects.select_related("building").filter(campus=campus, title__icontains=query))
+
+        # "Гл-305" is a building code plus a room number, not a substring of either.
+        parsed, resolved = resolve_room_code(query, campus.id)
+        if parsed and parsed[0] is not None:
+            rooms = list(resolved) or rooms
+
+        # Typos and wrong keyboard layout: only paid for when exact search comes up short.
+        if len(buildings) + len(rooms) + len(pois) < settings.FUZZY_SEARCH_MIN_RESULTS:
+            more_buildings, more_rooms, more_pois, suggestion = fuzzy_search(query, campus.id)
+            fuzzy = bool(more_buildings or more_rooms or more_pois)
+            buildings += [b for b in more_buildings if b not in buildings]
+            rooms += [r for r in more_rooms if r not in rooms]
+            pois += [p for p in more_pois if p not in pois]
 
     context = {
+        "campus": campus,
         "query": query,
         "buildings": buildings,
         "rooms": rooms,
         "pois": pois,
+        "fuzzy": fuzzy,
+        "suggestion": suggestion,
     }
     return render(request, "campus/search_results.html", context)
 
 
+def resolve_room(request, campus_slug=None):
+    campus = get_campus(campus_slug)
+    query = request.GET.get("q", "").strip()
+    parsed, rooms = resolve_room_code(query, campus.id)
+    if parsed is None:
+        return JsonResponse({"error": "Не удалось распознать код аудитории"}, status=400)
+
+    matches = [
+        {
+            "id": room.id,
+            "number": room.number,
+            "floor": room.floor,
+            "building_id": room.building_id,
+            "building_name": room.building.name,
+            "building_code": room.building.code,
+        }
+        for room in rooms[:20]
+    ]
+    return JsonResponse({
+        "campus": campus.slug,
+        "query": query,
+        "building_code": parsed[0],
+        "number": parsed[1],
+        "matches": matches,
+        "room": matches[0] if len(matches) == 1 else None,
+    })
+
+
 @require_http_methods(["POST"])
 @user_passes_test(lambda u: u.is_superuser)
 def create_poi(request):
@@ -73,8 +136,11 @@ def create_poi(request):
         building = None
         if building_id:
             building = Building.objects.get(id=building_id)
+        campus_slug = data.get("campus")
+        campus = Campus.objects.get(slug=campus_slug) if campus_slug else default_campus()
 
         poi = Poi.objects.create(
+            campus=campus,
             building=building,
             title=data["title"],
             type=data["type"],
@@ -83,7 +149,7 @@ def create_poi(request):
             info=data.get("info", ""),
         )
         return JsonResponse({"id": poi.id, "success": True})
-    except (KeyError, ValueError, json.JSONDecodeError, Building.DoesNotExist) as e:
+    except (KeyError, ValueError, json.JSONDecodeError, Building.DoesNotExist, Campus.DoesNotExist) as e:
         return JsonResponse({"error": "Invalid data", "details": str(e)}, status=400)
 
 
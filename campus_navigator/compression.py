@@ -0,0 +1,157 @@
+"""
+Response compression with a compress-once cache.
+
+Unlike ``django.middleware.gzip.GZipMiddleware`` the compressed body is
+stored in the cache under the hash of the uncompressed content, so a popular
+response (``pois_json``, search, the map page) is compressed once and every
+following request only pays for hashing and a cache lookup.
+"""
+
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+_accept_encoding_re = _lazy_re_compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*")
+
+
+def _gzip(data):
+    # mtime=0 makes the output deterministic for identical input.
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=5)
+
+
+def available_encodings():
+    """Encodings this server can produce, most preferred first."""
+    encoders = []
+    if brotli is not None:
+        encoders.append(("br", _brotli))
+    encoders.append(("gzip", _gzip))
+    return encoders
+
+
+def parse_accept_encoding(header):
+    """Return ``{coding: q}`` for an Accept-Encoding header value."""
+    result = {}
+    for part in header.split(","):
+        match = _accept_encoding_re.fullmatch(part)
+        if not match:
+            continue
+        coding, q = match.groups()
+        try:
+            result[coding.lower()] = float(q) if q is not None else 1.0
+        except ValueError:
+            continue
+    return result
+
+
+def choose_encoding(header):
+    """Pick the best encoding the client accepts, or ``None`` for identity."""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding, encoder in available_encodings():
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = (coding, encoder), q
+    return best
+
+
+class CompressionCacheMiddleware:
+    """
+    Compress responses with gzip/brotli and cache the compressed variants
+    keyed by the content hash.
+
+    Streaming, tiny, already encoded and non-text responses are passed
+    through untouched. Responses carrying a CSRF token are compressed but
+    not cached. ``Vary: Accept-Encoding`` is set on every response
+    that could have been compressed, including those served as identity.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.cache_alias = getattr(settings, "COMPRESSION_CACHE_ALIAS", "default")
+        self.cache_timeout = getattr(settings, "COMPRESSION_CACHE_TIMEOUT", 24 * 60 * 60)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def is_compressible(self, response):
+        if response.streaming or response.status_code != 200:
+            return False
+        if response.has_header("Content-Encoding"):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        return len(response.content) >= self.min_size
+
+    def is_cacheable(self, request, response):
+        # A page with a freshly masked CSRF token is unique on every render;
+        # caching it would only evict useful entries. CsrfViewMiddleware runs
+        # inside this one and resets its request flags, but it (re)sets the
+        # cookie on every response that used the token. Other per-user pages
+        # (Vary: Cookie) are fine: the key is the hash of the exact body, so
+        # an entry is only ever shared by identical responses.
+        return settings.CSRF_COOKIE_NAME not in response.cookies
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        chosen = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if chosen is None:
+            return response
+        coding, encoder = chosen
+
+        content = response.content
+        if self.is_cacheable(request, response):
+            digest = hashlib.blake2b(content, digest_size=20).hexdigest()
+            key = f"compressed:{coding}:{digest}"
+            cache = caches[self.cache_alias]
+
+            compressed = cache.get(key)
+            hit = compressed is not None
+            if not hit:
+                compressed = encoder(content)
+                cache.set(key, compressed, self.cache_timeout)
+            response.compression_cache_hit = hit
+        else:
+            compressed = encoder(content)
+
+        if len(compressed) >= len(content):
+            return response
+
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = coding
+        # The body changed, so a strong ETag would no longer be valid.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
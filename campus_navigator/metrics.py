@@ -0,0 +1,349 @@
+"""
+Low-overhead request and database metrics exposed in Prometheus text format.
+
+Every worker process accumulates counters and histograms in memory. When
+``METRICS_DIR`` is configured each process periodically dumps its state to
+``METRICS_DIR/metrics-<pid>.json`` and ``/metrics`` merges all these files,
+so the endpoint reports totals for the whole server no matter which worker
+answers the scrape. Files not refreshed within ``METRICS_STALE_AFTER``
+seconds (dead or idle workers) are folded into ``archived.json``, so the
+merged counters never go down. A worker whose file was archived starts its
+next file from zero. The endpoint is open to staff users and to the
+addresses in ``METRICS_ALLOWED_IPS``.
+"""
+
+import bisect
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HELP = {
+    "campus_http_requests_total": ("counter", "HTTP requests by view, method and status."),
+    "campus_http_request_duration_seconds": ("histogram", "Request latency by view."),
+    "campus_http_response_size_bytes": ("histogram", "Response body size (after compression) by view."),
+    "campus_db_queries_per_request": ("histogram", "SQL queries issued per request by view."),
+    "campus_db_query_duration_seconds_total": ("counter", "Time spent executing SQL by view."),
+    "campus_cache_requests_total": ("counter", "Cache lookups by cache and result."),
+}
+
+
+class Registry:
+    """In-process store for counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._written = None
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                # One slot per bucket, one for +Inf, then sum.
+                state = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def dump(self):
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, list(labels), list(state)] for (name, labels), state in self._histograms.items()],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._last_flush = 0.0
+            self._written = None
+
+    def _subtract(self, dump):
+        counters, histograms = merge([dump])
+        with self._lock:
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) - value
+            for key, state in histograms.items():
+                current = self._histograms.get(key)
+                if current is not None:
+                    self._histograms[key] = [a - b for a, b in zip(current, state)]
+
+    def flush(self, directory):
+        with self._flush_lock:
+            self._write(directory)
+
+    def _write(self, directory):
+        path = Path(directory) / f"metrics-{os.getpid()}.json"
+        if self._written is not None and not path.exists():
+            # collect() archived the file while this worker was idle; the
+            # archive already holds everything written so far.
+            self._subtract(self._written)
+        dump = self.dump()
+        _write_json(path, dump)
+        self._written = dump
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        """Flush if the interval has passed; called on every request, never raises."""
+        directory = getattr(settings, "METRICS_DIR", None)
+        if not directory:
+            return
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+        if time.monotonic() - self._last_flush < interval:
+            return
+        # Another thread is already flushing; this request does not wait for it.
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._last_flush >= interval:
+                self._write(directory)
+        except Exception:
+            logger.exception("Could not write metrics to %s", directory)
+        finally:
+            self._flush_lock.release()
+
+
+registry = Registry()
+
+
+def _write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(data))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def record_cache(cache_name, hit):
+    """Count a cache lookup; used by every cache in the project."""
+    registry.inc("campus_cache_requests_total", (("cache", cache_name), ("result", "hit" if hit else "miss")))
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook counting queries and their time."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL usage and response size per URL name.
+
+    Should be the first entry in ``MIDDLEWARE`` so it measures the whole
+    stack and sees the response as it is sent (i.e. after compression).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        labels = (("view", view),)
+
+        registry.inc(
+            "campus_http_requests_total",
+            (("view", view), ("method", request.method), ("status", str(response.status_code))),
+        )
+        registry.observe("campus_http_request_duration_seconds", labels, elapsed, LATENCY_BUCKETS)
+        registry.observe("campus_db_queries_per_request", labels, queries.count, QUERY_COUNT_BUCKETS)
+        registry.inc("campus_db_query_duration_seconds_total", labels, queries.duration)
+        if not response.streaming:
+            registry.observe("campus_http_response_size_bytes", labels, len(response.content), SIZE_BUCKETS)
+
+        compression_hit = getattr(response, "compression_cache_hit", None)
+        if compression_hit is not None:
+            record_cache("compression", compression_hit)
+
+        registry.maybe_flush()
+        return response
+
+
+def collect():
+    """Merge the dumps of all worker processes (or just this one)."""
+    directory = getattr(settings, "METRICS_DIR", None)
+    if not directory:
+        return [registry.dump()]
+    try:
+        registry.flush(directory)
+    except OSError:
+        logger.exception("Could not write metrics to %s", directory)
+    directory = Path(directory)
+    stale_before = time.time() - getattr(settings, "METRICS_STALE_AFTER", 60)
+    try:
+        lock = open(directory / "archive.lock", "w")
+    except OSError:
+        logger.exception("Could not read metrics from %s", directory)
+        return [registry.dump()]
+    # Scrapes are serialised so that a dump being archived is never missing
+    # from both the live files and the archive.
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dumps = []
+        pending = list(directory.glob("metrics-*.json.archiving"))
+        for path in directory.glob("metrics-*.json"):
+            try:
+                if path.stat().st_mtime < stale_before:
+                    # Renaming takes the file from under its worker atomically;
+                    # the worker notices and starts a new file from zero.
+                    archiving = path.with_name(path.name + ".archiving")
+                    path.rename(archiving)
+                    pending.append(archiving)
+                    continue
+                dumps.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # A worker may be replacing its file right now.
+                continue
+        archived = _archive(directory, pending)
+        if archived is not None:
+            dumps.append(archived)
+    return dumps
+
+
+def _archive(directory, pending):
+    """Fold ``pending`` dumps into ``archived.json`` and return its content."""
+    path = directory / "archived.json"
+    try:
+        archived = json.loads(path.read_text())
+    except FileNotFoundError:
+        archived = None
+    if not pending:
+        return archived
+    dumps = [archived] if archived is not None else []
+    for dump_path in pending:
+        try:
+            dumps.append(json.loads(dump_path.read_text()))
+        except (OSError, ValueError):
+            logger.warning("Dropping unreadable metrics file %s", dump_path)
+    counters, histograms = merge(dumps)
+    archived = {
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), state] for (name, labels), state in histograms.items()],
+    }
+    _write_json(path, archived)
+    for dump_path in pending:
+        dump_path.unlink(missing_ok=True)
+    return archived
+
+
+def merge(dumps):
+    counters, histograms = {}, {}
+    for dump in dumps:
+        for name, labels, value in dump["counters"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, state in dump["histograms"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            current = histograms.get(key)
+            if current is None:
+                histograms[key] = list(state)
+            else:
+                histograms[key] = [a + b for a, b in zip(current, state)]
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _buckets_for(name):
+    if name == "campus_http_request_duration_seconds":
+        return LATENCY_BUCKETS
+    if name == "campus_http_response_size_bytes":
+        return SIZE_BUCKETS
+    return QUERY_COUNT_BUCKETS
+
+
+def render(counters, histograms):
+    lines = []
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), state in histograms.items():
+        by_name.setdefault(name, []).append((labels, state))
+
+    for name in sorted(by_name):
+        kind, help_text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name[name]):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            buckets = _buckets_for(name)
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            cumulative += value[len(buckets)]
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_allowed(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    return request.META.get("REMOTE_ADDR") in getattr(settings, "METRICS_ALLOWED_IPS", ())
+
+
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    counters, histograms = merge(collect())
+    return HttpResponse(render(counters, histograms), content_type="text/plain; version=0.0.4; charset=utf-8")
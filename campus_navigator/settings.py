@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'campus',
     'accounts',
+    'jobs',
 ]
 
 
 MIDDLEWARE = [
+    'campus_navigator.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'campus_navigator.compression.CompressionCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,6 +89,74 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by all processes so the background worker can warm it.
+    'campus': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'campus_cache',
+    },
+    'compression': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'compression',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+# Compressed variants of responses are stored here keyed by content hash,
+# so each distinct body is gzipped/brotli'd only once.
+COMPRESSION_CACHE_ALIAS = 'compression'
+COMPRESSION_CACHE_TIMEOUT = 60 * 60 * 24
+COMPRESSION_MIN_SIZE = 1024
+
+
+# Campus served by the unscoped URLs (/, /api/pois/, /search/ ...).
+DEFAULT_CAMPUS_SLUG = 'main'
+
+CAMPUS_CACHE_ALIAS = 'campus'
+# Published payloads are replaced by the next publish rather than expired,
+# so a request never has to rebuild one just because it timed out.
+CAMPUS_CACHE_TIMEOUT = None
+# Seconds after an edit before requests stop waiting for the background
+# worker and build the new payload themselves.
+CAMPUS_PUBLISH_GRACE = 5 * 60
+
+# search_view falls back to typo/layout-tolerant matching (campus.fuzzy)
+# when exact search finds fewer results than this.
+FUZZY_SEARCH_MIN_RESULTS = 3
+
+# Memory-mapped snapshots of campus data shared by all worker processes
+# (campus.snapshot, `manage.py build_snapshot`). Disabled without a directory.
+SNAPSHOT_DIR = os.environ.get('CAMPUS_SNAPSHOT_DIR')
+
+
+# Background jobs (`manage.py run_worker`)
+
+JOBS_COALESCE_DELAY = 2      # seconds to wait for more edits before rebuilding
+JOBS_RETRY_BACKOFF = 10      # seconds before the first retry, doubled each time
+JOBS_STALE_AFTER = 15 * 60   # running jobs older than this are requeued
+JOBS_STALE_CHECK_INTERVAL = 60   # how often each worker looks for them
+
+
+# Metrics
+# Each worker dumps its counters into METRICS_DIR at most every
+# METRICS_FLUSH_INTERVAL seconds; /metrics merges them. Without a directory
+# only the worker answering the scrape is reported.
+
+METRICS_DIR = os.environ.get('CAMPUS_METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_STALE_AFTER = 60     # seconds without a flush before a dump is archived
+# Addresses allowed to scrape /metrics besides staff users. REMOTE_ADDR is
+# checked, so behind a reverse proxy every client appears to come from the
+# proxy; only list addresses that reach the application directly.
+METRICS_ALLOWED_IPS = []
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
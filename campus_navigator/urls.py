@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from campus_navigator.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     # Custom account views should be checked first so logout uses our GET-friendly handler.
     path('accounts/', include('accounts.urls')),            # register, profile, logout
     path('accounts/', include('django.contrib.auth.urls')),  # login, password reset и т.д.
@@ -0,0 +1,30 @@
+from django.contrib import admin, messages
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "max_attempts", "run_after", "created_at", "finished_at", "worker")
+    list_filter = ("status", "name")
+    search_fields = ("name", "dedupe_key", "last_error")
+    readonly_fields = ("created_at", "started_at", "finished_at", "worker", "last_error")
+    actions = ("retry_jobs",)
+
+    @admin.action(description="Перезапустить выбранные задачи")
+    def retry_jobs(self, request, queryset):
+        retried = 0
+        for job in queryset.exclude(status=Job.RUNNING):
+            job.status = Job.PENDING
+            job.attempts = 0
+            job.run_after = timezone.now()
+            try:
+                with transaction.atomic():
+                    job.save(update_fields=["status", "attempts", "run_after"])
+                retried += 1
+            except IntegrityError:
+                # An identical job is already waiting in the queue.
+                continue
+        self.message_user(request, f"Задач поставлено в очередь: {retried}.", messages.SUCCESS)
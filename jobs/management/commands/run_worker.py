@@ -0,0 +1,93 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker, worker_name
+
+
+class StopFlag:
+    """
+    Stop request set from a signal handler.
+
+    Unlike ``multiprocessing.Event`` it involves no locks, so a handler can
+    never deadlock against the interrupted code, and a child killed with
+    SIGKILL cannot leave it in a state that blocks the other processes.
+    """
+
+    def __init__(self):
+        self.stopped = False
+
+    def set(self, *args):
+        self.stopped = True
+
+    def is_set(self):
+        return self.stopped
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+
+def _worker_main(poll_interval, burst):
+    # The parent handles Ctrl+C and stops the children with SIGTERM.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop = StopFlag()
+    signal.signal(signal.SIGTERM, stop.set)
+    Worker(poll_interval=poll_interval).run(stop_event=stop, burst=burst)
+
+
+class Command(BaseCommand):
+    help = "Запускает обработчики фоновых задач (очередь в базе данных)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Число процессов-обработчиков.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Пауза между опросами пустой очереди, с.")
+        parser.add_argument("--burst", action="store_true", help="Выполнить все готовые задачи и выйти.")
+
+    def handle(self, *args, processes, poll_interval, burst, **options):
+        if processes <= 1:
+            self.stdout.write("Обработчик запущен.")
+            try:
+                Worker(poll_interval=poll_interval).run(burst=burst)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        ctx = multiprocessing.get_context("fork")
+        stop = StopFlag()
+        signal.signal(signal.SIGTERM, stop.set)
+        signal.signal(signal.SIGINT, stop.set)
+
+        def spawn():
+            # Forked children must not share the parent's database connections.
+            connections.close_all()
+            child = ctx.Process(target=_worker_main, args=(poll_interval, burst), daemon=True)
+            child.start()
+            return child
+
+        children = [spawn() for _ in range(processes)]
+        self.stdout.write(f"Запущено обработчиков: {processes}.")
+
+        stopping = False
+        while children:
+            time.sleep(0.5)
+            if stop.is_set() and not stopping:
+                stopping = True
+                for child in children:
+                    if child.is_alive():
+                        child.terminate()
+            for i, child in enumerate(children):
+                if child.is_alive():
+                    continue
+                child.join()
+                if child.exitcode != 0 and child.exitcode != -signal.SIGTERM:
+                    # Whatever the dead child was running goes back to the queue now.
+                    Worker().requeue_stale(worker=worker_name(child.pid))
+                if stopping or (burst and child.exitcode == 0):
+                    children[i] = None
+                else:
+                    self.stderr.write(f"Обработчик {child.pid} завершился с кодом {child.exitcode}, перезапуск.")
+                    children[i] = spawn()
+            children = [child for child in children if child is not None]
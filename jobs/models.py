@@ -0,0 +1,54 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задача в очереди фоновых задач (см. ``manage.py run_worker``)."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Ожидает"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    ]
+
+    name = models.CharField("Задача", max_length=100)
+    payload = models.JSONField("Параметры", default=dict, blank=True)
+    dedupe_key = models.CharField(
+        "Ключ дедупликации",
+        max_length=255,
+        blank=True,
+        help_text="Одинаковые ожидающие задачи с этим ключом объединяются в одну",
+    )
+    status = models.CharField("Статус", max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveIntegerField("Макс. попыток", default=3)
+    run_after = models.DateTimeField("Не раньше", default=timezone.now)
+    created_at = models.DateTimeField("Создана", auto_now_add=True)
+    started_at = models.DateTimeField("Начата", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершена", null=True, blank=True)
+    worker = models.CharField("Обработчик", max_length=100, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="jobs_job_status_run_after"),
+        ]
+        constraints = [
+            # At most one pending job per key: this is what coalesces bursts of edits.
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=Q(status="pending") & ~Q(dedupe_key=""),
+                name="jobs_job_unique_pending_dedupe_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,79 @@
+"""
+Registering job handlers and putting jobs on the queue.
+
+Handlers are plain functions taking the job payload as keyword arguments::
+
+    @register("campus.warm_caches")
+    def warm_caches(campus_id=None):
+        ...
+
+    enqueue_on_commit("campus.warm_caches", delay=2)
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+_handlers = {}
+
+
+def register(name):
+    """Decorator registering ``func`` as the handler of jobs called ``name``."""
+
+    def decorator(func):
+        _handlers[name] = func
+        return func
+
+    return decorator
+
+
+def get_handler(name):
+    return _handlers.get(name)
+
+
+def make_dedupe_key(name, payload):
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{name}:{hashlib.sha1(canonical.encode()).hexdigest()}"
+
+
+def enqueue(name, payload=None, *, dedupe=True, delay=0, max_attempts=3):
+    """
+    Put a job on the queue and return it.
+
+    With ``dedupe`` an identical job that is still pending is returned
+    instead of creating a new one, so a burst of edits results in a single
+    rebuild. ``delay`` (seconds) postpones the job, giving the burst time
+    to coalesce.
+    """
+    if name not in _handlers:
+        raise KeyError(f"Unknown job: {name}")
+    payload = payload or {}
+    key = make_dedupe_key(name, payload) if dedupe else ""
+
+    if key:
+        existing = Job.objects.filter(dedupe_key=key, status=Job.PENDING).first()
+        if existing is not None:
+            return existing
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=payload,
+                dedupe_key=key,
+                max_attempts=max_attempts,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        # Another process enqueued the same job between our check and insert.
+        return Job.objects.get(dedupe_key=key, status=Job.PENDING)
+
+
+def enqueue_on_commit(name, payload=None, **kwargs):
+    """Enqueue once the current transaction commits (immediately if there is none)."""
+    transaction.on_commit(lambda: enqueue(name, payload, **kwargs))
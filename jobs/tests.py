@@ -0,0 +1,147 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from campus.cache import get_data_version, pois_key
+from campus.models import Building, Poi
+from jobs.models import Job
+from jobs.queue import enqueue, register
+from jobs.worker import Worker
+
+calls = []
+
+
+@register("tests.record")
+def record_job(value=None):
+    calls.append(value)
+
+
+@register("tests.fail")
+def failing_job():
+    raise RuntimeError("boom")
+
+
+class EnqueueTestCase(TestCase):
+    def test_identical_pending_jobs_are_coalesced(self):
+        first = enqueue("tests.record", {"value": 1})
+        for _ in range(49):
+            self.assertEqual(enqueue("tests.record", {"value": 1}).pk, first.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_different_payloads_are_separate_jobs(self):
+        enqueue("tests.record", {"value": 1})
+        enqueue("tests.record", {"value": 2})
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_new_job_is_queued_while_previous_one_runs(self):
+        job = enqueue("tests.record", {"value": 1})
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING)
+        self.assertNotEqual(enqueue("tests.record", {"value": 1}).pk, job.pk)
+
+    def test_unknown_job_is_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue("tests.missing")
+
+
+class WorkerTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_runs_due_jobs(self):
+        job = enqueue("tests.record", {"value": "ok"})
+        Worker().run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(calls, ["ok"])
+
+    def test_delayed_job_is_not_run_early(self):
+        job = enqueue("tests.record", {"value": "later"}, delay=60)
+        Worker().run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = enqueue("tests.fail", max_attempts=2)
+        with self.assertLogs("jobs.worker", "ERROR"):
+            Worker().run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertIn("boom", job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs("jobs.worker", "ERROR"):
+            Worker().run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue("tests.record", {"value": "stale"})
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, started_at=timezone.now() - timedelta(hours=1)
+        )
+        Worker().requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+
+    def test_stale_job_out_of_attempts_is_failed(self):
+        job = enqueue("tests.record", {"value": "killer"}, max_attempts=2)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=2, started_at=timezone.now() - timedelta(hours=1)
+        )
+        with self.assertLogs("jobs.worker", "ERROR"):
+            Worker().requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_jobs_of_a_dead_worker_are_requeued_at_once(self):
+        job = enqueue("tests.record", {"value": "orphan"})
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING, worker="host:123", started_at=timezone.now())
+        Worker().requeue_stale(worker="host:456")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        Worker().requeue_stale(worker="host:123")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+
+    def test_running_worker_sweeps_periodically(self):
+        job = enqueue("tests.record", {"value": "stale"})
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=1, started_at=timezone.now() - timedelta(hours=1)
+        )
+        worker = Worker()
+        with self.settings(JOBS_STALE_CHECK_INTERVAL=0, JOBS_RETRY_BACKOFF=0):
+            worker.run(burst=True)
+            worker.run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(calls, ["stale"])
+
+    def test_run_worker_command_burst(self):
+        enqueue("tests.record", {"value": "cmd"})
+        call_command("run_worker", "--burst", stdout=StringIO())
+        self.assertEqual(calls, ["cmd"])
+
+
+class CampusJobsTestCase(TestCase):
+    def test_poi_edits_coalesce_into_one_warm_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            building = Building.objects.create(name="Корпус Е", code="Е", lat=55.8, lng=37.6)
+            for i in range(50):
+                Poi.objects.create(building=building, title=f"Точка {i}", type="point", lat=55.8, lng=37.6)
+        self.assertEqual(Job.objects.filter(name="campus.warm_caches", status=Job.PENDING).count(), 1)
+
+    def test_warm_job_fills_pois_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            poi = Poi.objects.create(title="Столовая", type="canteen", lat=55.8, lng=37.6)
+        Job.objects.update(run_after=timezone.now())
+        Worker().run(burst=True)
+        version, payload = caches["campus"].get(pois_key(poi.campus_id))
+        self.assertEqual(version, get_data_version(poi.campus_id))
+        self.assertIn("Столовая".encode("unicode_escape"), payload)
@@ -0,0 +1,140 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .queue import get_handler
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name(pid=None):
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+class Worker:
+    """Takes jobs from the database queue and runs them one at a time."""
+
+    def __init__(self, name=None, poll_interval=1.0):
+        self.name = name or worker_name()
+        self.poll_interval = poll_interval
+        self._last_sweep = None
+
+    def claim(self):
+        """Atomically move one due pending job to running and return it."""
+        now = timezone.now()
+        candidates = (
+            Job.objects.filter(status=Job.PENDING, run_after__lte=now)
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[:10]
+        )
+        for job_id in list(candidates):
+            claimed = Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+                status=Job.RUNNING,
+                started_at=now,
+                finished_at=None,
+                worker=self.name,
+                attempts=F("attempts") + 1,
+            )
+            if claimed:
+                return Job.objects.get(pk=job_id)
+        return None
+
+    def run_job(self, job):
+        handler = get_handler(job.name)
+        if handler is None:
+            self._finish(job, Job.FAILED, f"Неизвестная задача: {job.name}")
+            return
+
+        started = time.perf_counter()
+        try:
+            handler(**job.payload)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception("Job %s failed (attempt %s/%s)", job, job.attempts, job.max_attempts)
+            if job.attempts < job.max_attempts:
+                self._retry(job, error)
+            else:
+                self._finish(job, Job.FAILED, error)
+        else:
+            logger.info("Job %s done in %.3fs", job, time.perf_counter() - started)
+            self._finish(job, Job.DONE)
+
+    def _finish(self, job, status, error=""):
+        job.status = status
+        job.finished_at = timezone.now()
+        job.last_error = error
+        job.save(update_fields=["status", "finished_at", "last_error"])
+
+    def _retry(self, job, error):
+        backoff = getattr(settings, "JOBS_RETRY_BACKOFF", 10) * 2 ** (job.attempts - 1)
+        job.status = Job.PENDING
+        job.run_after = timezone.now() + timedelta(seconds=backoff)
+        job.last_error = error
+        try:
+            with transaction.atomic():
+                job.save(update_fields=["status", "run_after", "last_error"])
+        except IntegrityError:
+            # An identical job was enqueued meanwhile and will do the same work.
+            self._finish(job, Job.FAILED, error + "\nПовтор не нужен: уже есть такая же ожидающая задача.")
+
+    def requeue_stale(self, worker=None):
+        """
+        Return jobs left running by a crashed worker to the queue, or fail
+        them if they have used up their attempts (a job that kills its
+        worker must not be retried forever).
+
+        With ``worker`` only that worker's jobs are handled, however recent.
+        """
+        now = timezone.now()
+        if worker is not None:
+            stale = Job.objects.filter(status=Job.RUNNING, worker=worker)
+        else:
+            stale_after = getattr(settings, "JOBS_STALE_AFTER", 15 * 60)
+            stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=now - timedelta(seconds=stale_after))
+        for job in stale:
+            # Several workers may sweep at once; only one handles each job.
+            if not Job.objects.filter(pk=job.pk, status=Job.RUNNING, started_at=job.started_at).update(started_at=now):
+                continue
+            error = job.last_error or "Обработчик перестал отвечать"
+            if job.attempts >= job.max_attempts:
+                logger.error("Job %s abandoned by %s after %s attempts", job, job.worker, job.attempts)
+                self._finish(job, Job.FAILED, error)
+            else:
+                self._retry(job, error)
+
+    def maybe_requeue_stale(self):
+        interval = getattr(settings, "JOBS_STALE_CHECK_INTERVAL", 60)
+        if self._last_sweep is None or time.monotonic() - self._last_sweep >= interval:
+            self._last_sweep = time.monotonic()
+            self.requeue_stale()
+
+    def run_once(self):
+        """Run a single due job. Returns False when the queue is empty."""
+        close_old_connections()
+        self.maybe_requeue_stale()
+        job = self.claim()
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def run(self, stop_event=None, burst=False):
+        """Process jobs until ``stop_event`` is set (or the queue drains with ``burst``)."""
+        while stop_event is None or not stop_event.is_set():
+            if self.run_once():
+                continue
+            if burst:
+                return
+            if stop_event is not None:
+                stop_event.wait(self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
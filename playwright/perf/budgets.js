@@ -0,0 +1,37 @@
+// Agreed performance budgets. Any value can be overridden from the
+// environment, e.g. PERF_MAP_FIRST_MARKER_MS=4000 on slow CI machines.
+//
+// Measured on the seeded dataset (seed_perf_data --rooms 2000 --pois 5000,
+// runserver, 5 runs per query):
+//   search "Синтетическая": 406-626 ms server response, 66 KB gzipped page
+//   search "10" / "cnjkjdfz": 11-75 ms, 2-6 KB
+//   map: 5.4 KB gzipped page + 3.4 KB ymaps stub + 126 KB gzipped /api/pois/
+//        (seed_perf_data --pois 5000)
+// Browser-side budgets (first marker, selects, long tasks, heap, DOMContentLoaded)
+// have not been confirmed by a browser run yet; tighten them from the
+// "map perf"/"search perf" lines the suite prints.
+function budget(name, fallback) {
+    const value = process.env[name];
+    return value ? Number(value) : fallback;
+}
+
+module.exports = {
+    map: {
+        poiCount: budget('PERF_MAP_POI_COUNT', 5000),
+        firstMarkerMs: budget('PERF_MAP_FIRST_MARKER_MS', 2500),
+        selectsFilledMs: budget('PERF_MAP_SELECTS_FILLED_MS', 3000),
+        longestTaskMs: budget('PERF_MAP_LONGEST_TASK_MS', 400),
+        totalLongTasksMs: budget('PERF_MAP_TOTAL_LONG_TASKS_MS', 1000),
+        jsHeapMb: budget('PERF_MAP_JS_HEAP_MB', 60),
+        transferredKb: budget('PERF_MAP_TRANSFERRED_KB', 170),
+    },
+    search: {
+        rooms: budget('PERF_SEARCH_ROOMS', 2000),
+        pois: budget('PERF_SEARCH_POIS', 5000),
+        serverResponseMs: budget('PERF_SEARCH_RESPONSE_MS', 800),
+        domContentLoadedMs: budget('PERF_SEARCH_DCL_MS', 1500),
+        longestTaskMs: budget('PERF_SEARCH_LONGEST_TASK_MS', 300),
+        jsHeapMb: budget('PERF_SEARCH_JS_HEAP_MB', 40),
+        transferredKb: budget('PERF_SEARCH_TRANSFERRED_KB', 120),
+    },
+};
@@ -0,0 +1,59 @@
+const path = require('path');
+const { execFileSync } = require('child_process');
+
+const BASE_URL = process.env.BASE_URL || 'http://127.0.0.1:8000';
+const ROOT = path.resolve(__dirname, '..', '..');
+
+// Third-party scripts are served locally so the suite needs no network and
+// measures only our own pages.
+async function stubExternalScripts(page) {
+    await page.route('https://api-maps.yandex.ru/**', route =>
+        route.fulfill({ path: path.join(__dirname, 'ymaps-stub.js'), contentType: 'application/javascript' }));
+    await page.route('https://cdn.tailwindcss.com/**', route =>
+        route.fulfill({ body: 'window.tailwind = {};', contentType: 'application/javascript' }));
+}
+
+async function observeLongTasks(page) {
+    await page.addInitScript(() => {
+        window.__longTasks = [];
+        new PerformanceObserver(list => {
+            list.getEntries().forEach(e => window.__longTasks.push(e.duration));
+        }).observe({ type: 'longtask', buffered: true });
+    });
+}
+
+// Counts encoded bytes of every response, including fulfilled routes.
+async function trackTransferredBytes(page) {
+    const cdp = await page.context().newCDPSession(page);
+    await cdp.send('Network.enable');
+    await cdp.send('Performance.enable');
+    const state = { bytes: 0, cdp };
+    cdp.on('Network.loadingFinished', e => { state.bytes += e.encodedDataLength; });
+    return state;
+}
+
+async function collectMetrics(page, tracker) {
+    const { metrics } = await tracker.cdp.send('Performance.getMetrics');
+    const heap = metrics.find(m => m.name === 'JSHeapUsedSize').value;
+    const longTasks = await page.evaluate(() => window.__longTasks || []);
+    return {
+        jsHeapMb: heap / (1024 * 1024),
+        transferredKb: tracker.bytes / 1024,
+        longestTaskMs: longTasks.length ? Math.max(...longTasks) : 0,
+        totalLongTasksMs: longTasks.reduce((a, b) => a + b, 0),
+    };
+}
+
+function manage(...args) {
+    const python = process.env.PYTHON || 'python';
+    execFileSync(python, ['manage.py', ...args], { cwd: ROOT, stdio: 'inherit' });
+}
+
+module.exports = {
+    BASE_URL,
+    stubExternalScripts,
+    observeLongTasks,
+    trackTransferredBytes,
+    collectMetrics,
+    manage,
+};
@@ -0,0 +1,106 @@
+// Local stand-in for the Yandex Maps API used by the performance suite.
+// It keeps the page's own work (building placemarks, filling selects) real,
+// renders one lightweight DOM node per placemark and marks the moment the
+// first marker reaches the map as `first-marker`.
+(function () {
+    let firstMarkerMarked = false;
+
+    function markFirstMarker() {
+        if (!firstMarkerMarked) {
+            firstMarkerMarked = true;
+            performance.mark('first-marker');
+        }
+    }
+
+    function EventManager() {
+        this.handlers = {};
+    }
+    EventManager.prototype.add = function (name, fn) {
+        (this.handlers[name] = this.handlers[name] || []).push(fn);
+    };
+    EventManager.prototype.remove = function (name, fn) {
+        this.handlers[name] = (this.handlers[name] || []).filter(h => h !== fn);
+    };
+
+    function Placemark(coords, properties, options) {
+        this.coords = coords;
+        this.properties = properties;
+        this.options = options;
+    }
+
+    function GeoObjectCollection() {
+        this.items = [];
+    }
+    GeoObjectCollection.prototype.add = function (obj) {
+        this.items.push(obj);
+        return this;
+    };
+    GeoObjectCollection.prototype.getLength = function () {
+        return this.items.length;
+    };
+
+    function MapGeoObjects(container) {
+        this.container = container;
+        this.items = [];
+    }
+    MapGeoObjects.prototype.render = function (obj) {
+        const placemarks = obj instanceof GeoObjectCollection ? obj.items : [obj];
+        const fragment = document.createDocumentFragment();
+        placemarks.forEach(p => {
+            if (!(p instanceof Placemark)) return;
+            const node = document.createElement('div');
+            node.className = 'ymaps-stub-placemark';
+            node.title = p.properties.hintContent || '';
+            fragment.appendChild(node);
+        });
+        this.container.appendChild(fragment);
+        if (placemarks.length) markFirstMarker();
+    };
+    MapGeoObjects.prototype.add = function (obj) {
+        this.items.push(obj);
+        this.render(obj);
+        return this;
+    };
+    MapGeoObjects.prototype.remove = function (obj) {
+        this.items = this.items.filter(o => o !== obj);
+        return this;
+    };
+    MapGeoObjects.prototype.removeAll = function () {
+        this.items = [];
+        this.container.querySelectorAll('.ymaps-stub-placemark').forEach(n => n.remove());
+        return this;
+    };
+
+    function Map(id, state) {
+        this.container = document.getElementById(id);
+        this.center = state.center;
+        this.zoom = state.zoom;
+        this.geoObjects = new MapGeoObjects(this.container);
+        this.events = new EventManager();
+    }
+    Map.prototype.setCenter = function (center, zoom) {
+        this.center = center;
+        if (zoom !== undefined) this.zoom = zoom;
+        return Promise.resolve();
+    };
+    Map.prototype.panTo = Map.prototype.setCenter;
+    Map.prototype.setBounds = function () {
+        return Promise.resolve();
+    };
+
+    window.ymaps = {
+        ready(fn) {
+            if (document.readyState === 'loading') {
+                document.addEventListener('DOMContentLoaded', () => fn());
+            } else {
+                setTimeout(fn, 0);
+            }
+        },
+        Map,
+        Placemark,
+        GeoObjectCollection,
+        route(points) {
+            return Promise.resolve({ points, getBounds: () => points });
+        },
+    };
+})();
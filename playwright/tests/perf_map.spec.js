@@ -0,0 +1,57 @@
+const { test, expect } = require('@playwright/test');
+const budgets = require('../perf/budgets');
+const {
+    BASE_URL,
+    stubExternalScripts,
+    observeLongTasks,
+    trackTransferredBytes,
+    collectMetrics,
+    manage,
+} = require('../perf/helpers');
+
+// Seeds the database the dev server at BASE_URL is using; the page fetches
+// the real /api/pois/, so the transfer budget covers its compressed size.
+test.describe('@perf Карта: производительность на большом наборе точек', () => {
+    test.describe.configure({ mode: 'serial' });
+    test.skip(({ browserName }) => browserName !== 'chromium', 'Метрики снимаются через CDP');
+
+    test.beforeAll(() => {
+        manage('seed_perf_data', '--pois', String(budgets.map.poiCount));
+    });
+
+    test.afterAll(() => {
+        manage('seed_perf_data', '--clear');
+    });
+
+    test(`Карта с ${budgets.map.poiCount} POI укладывается в бюджет`, async ({ page }) => {
+        await stubExternalScripts(page);
+        await observeLongTasks(page);
+        const tracker = await trackTransferredBytes(page);
+
+        const poisResponse = page.waitForResponse(response => response.url().endsWith('/api/pois/'));
+        await page.goto(`${BASE_URL}/`);
+        // The campus may hold more than the seeded points.
+        const pois = await (await poisResponse).json();
+        expect(pois.length).toBeGreaterThanOrEqual(budgets.map.poiCount);
+
+        const firstMarker = await page.waitForFunction(
+            () => performance.getEntriesByName('first-marker')[0]?.startTime
+        );
+        const firstMarkerMs = await firstMarker.jsonValue();
+
+        await expect(page.locator('#routeFrom option')).toHaveCount(pois.length + 1);
+        const selectsFilledMs = await page.evaluate(() => performance.now());
+        const metrics = await collectMetrics(page, tracker);
+
+        const report = { firstMarkerMs, selectsFilledMs, ...metrics };
+        test.info().annotations.push({ type: 'perf', description: JSON.stringify(report) });
+        console.log('map perf', report);
+
+        expect(firstMarkerMs, 'time to first marker').toBeLessThan(budgets.map.firstMarkerMs);
+        expect(selectsFilledMs, '"От/До" selects filled').toBeLessThan(budgets.map.selectsFilledMs);
+        expect(metrics.longestTaskMs, 'longest main-thread task').toBeLessThan(budgets.map.longestTaskMs);
+        expect(metrics.totalLongTasksMs, 'total long tasks').toBeLessThan(budgets.map.totalLongTasksMs);
+        expect(metrics.jsHeapMb, 'JS heap').toBeLessThan(budgets.map.jsHeapMb);
+        expect(metrics.transferredKb, 'transferred bytes').toBeLessThan(budgets.map.transferredKb);
+    });
+});
@@ -0,0 +1,60 @@
+const { test, expect } = require('@playwright/test');
+const budgets = require('../perf/budgets');
+const {
+    BASE_URL,
+    stubExternalScripts,
+    observeLongTasks,
+    trackTransferredBytes,
+    collectMetrics,
+    manage,
+} = require('../perf/helpers');
+
+// Seeds the database the dev server at BASE_URL is using.
+test.describe('@perf Поиск: производительность на большом наборе данных', () => {
+    test.describe.configure({ mode: 'serial' });
+    test.skip(({ browserName }) => browserName !== 'chromium', 'Метрики снимаются через CDP');
+
+    test.beforeAll(() => {
+        manage('seed_perf_data', '--rooms', String(budgets.search.rooms), '--pois', String(budgets.search.pois));
+    });
+
+    test.afterAll(() => {
+        manage('seed_perf_data', '--clear');
+    });
+
+    const queries = [
+        ['широкий запрос', 'Синтетическая'],
+        ['номер аудитории', '10'],
+        ['опечатка в раскладке', 'cnjkjdfz'],
+    ];
+
+    for (const [label, query] of queries) {
+        test(`Поиск (${label}) укладывается в бюджет`, async ({ page }) => {
+            await stubExternalScripts(page);
+            await observeLongTasks(page);
+            const tracker = await trackTransferredBytes(page);
+
+            await page.goto(`${BASE_URL}/search/?q=${encodeURIComponent(query)}`);
+            await expect(page.locator('h2')).toContainText('Результаты поиска');
+
+            const timing = await page.evaluate(() => {
+                const nav = performance.getEntriesByType('navigation')[0];
+                return {
+                    serverResponseMs: nav.responseEnd - nav.requestStart,
+                    domContentLoadedMs: nav.domContentLoadedEventEnd,
+                };
+            });
+            const metrics = await collectMetrics(page, tracker);
+
+            const report = { query, ...timing, ...metrics };
+            test.info().annotations.push({ type: 'perf', description: JSON.stringify(report) });
+            console.log('search perf', report);
+
+            expect(timing.serverResponseMs, 'server response').toBeLessThan(budgets.search.serverResponseMs);
+            expect(timing.domContentLoadedMs, 'DOMContentLoaded').toBeLessThan(budgets.search.domContentLoadedMs);
+            expect(metrics.longestTaskMs, 'longest main-thread task').toBeLessThan(budgets.search.longestTaskMs);
+            expect(metrics.jsHeapMb, 'JS heap').toBeLessThan(budgets.search.jsHeapMb);
+            expect(metrics.transferredKb, 'transferred bytes').toBeLessThan(budgets.search.transferredKb);
+        });
+    }
+});